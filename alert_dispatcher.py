@@ -0,0 +1,91 @@
+import base64
+import json
+import queue
+import threading
+import time
+
+import cv2
+
+from image_envelope import pack_image
+
+
+class AlertDispatcher:
+    """Throttles, encodes and publishes image alerts off the detection thread.
+
+    submit() checks the per-camera, per-topic throttle before doing any work,
+    then queues the frame with every alert raised for it. A worker thread boxes
+    the violators, JPEG-encodes the frame once and publishes each alert with
+    that shared image, so PM and noise alerts on the same frame cost one
+    encode. Alerts go out as binary image envelopes, or as the legacy JSON with
+    a base64 image when binary is False.
+
+    The queue is bounded: when the broker or encoder falls behind, new alerts
+    are dropped (and their throttle slot released) instead of piling up.
+    """
+
+    def __init__(self, client, interval, queue_size=8, binary=True):
+        self.client = client
+        self.interval = interval
+        self.binary = binary
+        self.jobs = queue.Queue(maxsize=queue_size)
+        self.last_sent = {}
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="alert-dispatcher", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    # Queue alerts for one frame. Each alert is (topic, payload dict, boxes to highlight).
+    # Returns the topics actually queued; throttled alerts are discarded before any encoding.
+    def submit(self, camera_id, image_frame, alerts):
+        now = time.time()
+        with self._lock:
+            due = []
+            for alert in alerts:
+                key = (camera_id, alert[0])
+                if now - self.last_sent.get(key, 0) >= self.interval:
+                    due.append(alert)
+                    self.last_sent[key] = now
+                else:
+                    print(f"Alert on {alert[0]} for {camera_id} throttled to avoid spamming.")
+        if not due:
+            return []
+
+        try:
+            self.jobs.put_nowait((camera_id, image_frame, due))
+        except queue.Full:
+            self.dropped += 1
+            with self._lock:
+                for topic, _, _ in due:
+                    self.last_sent[(camera_id, topic)] = 0
+            print(f"Alert queue full, dropped alert for {camera_id}")
+            return []
+        return [topic for topic, _, _ in due]
+
+    def _run(self):
+        while True:
+            camera_id, image_frame, alerts = self.jobs.get()
+            try:
+                jpeg_bytes = self._encode(image_frame, alerts)
+                if not self.binary:
+                    encoded_image = base64.b64encode(jpeg_bytes).decode('utf-8')
+                for topic, payload, _ in alerts:
+                    if self.binary:
+                        self.client.publish(topic, pack_image(jpeg_bytes, **payload))
+                    else:
+                        self.client.publish(topic, json.dumps(dict(payload, image=encoded_image)))
+                    print("Alert sent to:", topic, "from", camera_id)
+            except Exception as e:
+                print(f"Error publishing alert for {camera_id}: {e}")
+
+    # Box every violator (frames from the grabber are read-only, so draw on a copy) and encode once
+    @staticmethod
+    def _encode(image_frame, alerts):
+        boxes = {tuple(box) for _, _, alert_boxes in alerts for box in alert_boxes}
+        marked = image_frame.copy()
+        for x, y, w, h in boxes:
+            cv2.rectangle(marked, (x, y), (x + w, y + h), (0, 0, 255), 2)
+        _, buffer = cv2.imencode('.jpg', marked)
+        return buffer.tobytes()
@@ -0,0 +1,140 @@
+import numpy as np
+
+# Same calibration as the SPL in mic_store_new.py: dBFS + 60
+CALIBRATION_OFFSET_DB = 60.0
+
+# Nominal octave-band centre frequencies (Hz)
+OCTAVE_CENTRES = (31.5, 63, 125, 250, 500, 1000, 2000, 4000, 8000, 16000)
+
+_EPS = 1e-24
+
+
+# IEC 61672 A-weighting in dB for an array of frequencies
+def a_weighting_db(freqs):
+    f2 = np.asarray(freqs, dtype=np.float64) ** 2
+    ra = (12194.0 ** 2 * f2 ** 2) / (
+        (f2 + 20.6 ** 2) * np.sqrt((f2 + 107.7 ** 2) * (f2 + 737.9 ** 2)) * (f2 + 12194.0 ** 2)
+    )
+    with np.errstate(divide="ignore"):
+        return 20 * np.log10(ra) + 2.0
+
+
+def to_db(mean_square):
+    return 10 * np.log10(np.asarray(mean_square) + _EPS) + CALIBRATION_OFFSET_DB
+
+
+class NoiseFeatureExtractor:
+    """Vectorized A-weighted / octave-band levels for fixed-size audio blocks.
+
+    All filter coefficients are precomputed per FFT bin for the block size:
+    one rfft per block then yields, via a single matrix product, the unweighted
+    (Z) and A-weighted mean-square energy plus the energy in each octave band.
+    Windowed Leq/Lmax values are accumulated from those energies, so no raw
+    samples are kept. A rectangular window is used so that block energies add
+    up exactly (Parseval); band edges therefore have some spectral leakage.
+    """
+
+    def __init__(self, samplerate=44100, block_size=2048, centres=OCTAVE_CENTRES):
+        self.samplerate = samplerate
+        self.block_size = block_size
+        self.block_seconds = block_size / samplerate
+        self.centres = tuple(c for c in centres if c / np.sqrt(2) < samplerate / 2)
+
+        freqs = np.fft.rfftfreq(block_size, d=1.0 / samplerate)
+        # One-sided spectrum -> mean square: DC and Nyquist once, every other bin twice
+        bin_scale = np.full(len(freqs), 2.0 / block_size ** 2)
+        bin_scale[0] = 1.0 / block_size ** 2
+        if block_size % 2 == 0:
+            bin_scale[-1] = 1.0 / block_size ** 2
+
+        a_gain = 10 ** (a_weighting_db(freqs) / 10)
+        columns = [bin_scale, bin_scale * a_gain]
+        for centre in self.centres:
+            in_band = (freqs >= centre / np.sqrt(2)) & (freqs < centre * np.sqrt(2))
+            columns.append(bin_scale * in_band)
+        # (bins, 2 + bands): column 0 = Z energy, 1 = A energy, 2.. = octave bands
+        self.weights = np.stack(columns, axis=1)
+
+    @property
+    def n_features(self):
+        return self.weights.shape[1]
+
+    # Frame batch API: (n_blocks, block_size) samples -> (n_blocks, 2 + bands) mean-square energies
+    def block_energies(self, blocks):
+        blocks = np.atleast_2d(np.asarray(blocks, dtype=np.float64))
+        spectrum = np.fft.rfft(blocks, axis=-1)
+        power = spectrum.real ** 2 + spectrum.imag ** 2
+        return power @ self.weights
+
+    # Convenience for one block as delivered by sounddevice: (frames, channels) -> energies vector
+    def block_energy(self, indata):
+        return self.block_energies(np.mean(indata, axis=1))[0]
+
+
+class LeqAccumulator:
+    """Incremental Leq/Lmax over clock-aligned windows (e.g. 1 s or 60 s).
+
+    add() takes block energies with their timestamps and returns one record for
+    every window that closed. Only running sums and the max are kept.
+    """
+
+    def __init__(self, seconds, centres):
+        self.seconds = seconds
+        self.centres = centres
+        self.window = None
+        self.energy_sum = None
+        self.blocks = 0
+        self.max_a = -np.inf
+
+    def _record(self):
+        mean_energy = self.energy_sum / self.blocks
+        levels = to_db(mean_energy)
+        return {
+            "start": int(self.window * self.seconds),
+            "seconds": self.seconds,
+            "blocks": self.blocks,
+            "LZeq": float(levels[0]),
+            "LAeq": float(levels[1]),
+            "LAmax": float(to_db(self.max_a)),
+            "bands": {centre: float(level) for centre, level in zip(self.centres, levels[2:])},
+        }
+
+    # energies: (n_blocks, features), times: (n_blocks,) epoch seconds; returns closed window records
+    def add(self, energies, times):
+        energies = np.atleast_2d(energies)
+        window_ids = np.floor(np.atleast_1d(times) / self.seconds).astype(np.int64)
+        records = []
+
+        # Split the batch where the window changes and reduce each run in one go
+        starts = np.flatnonzero(np.r_[True, window_ids[1:] != window_ids[:-1]])
+        sums = np.add.reduceat(energies, starts, axis=0)
+        maxima = np.maximum.reduceat(energies[:, 1], starts)
+        counts = np.diff(np.r_[starts, len(window_ids)])
+
+        for window, energy, peak, count in zip(window_ids[starts], sums, maxima, counts):
+            if self.window is not None and window != self.window:
+                records.append(self._record())
+                self.window = None
+            if self.window is None:
+                self.window, self.energy_sum, self.blocks, self.max_a = window, energy.copy(), 0, peak
+            else:
+                self.energy_sum += energy
+                self.max_a = max(self.max_a, peak)
+            self.blocks += int(count)
+        return records
+
+
+class NoiseLevelMonitor:
+    """Extractor plus 1-second and 1-minute accumulators (LAeq, LZeq, LAmax, octave bands)."""
+
+    def __init__(self, samplerate=44100, block_size=2048, windows=(1, 60)):
+        self.extractor = NoiseFeatureExtractor(samplerate, block_size)
+        self.accumulators = {seconds: LeqAccumulator(seconds, self.extractor.centres) for seconds in windows}
+
+    # Feed precomputed block energies; returns {window seconds: [closed records]}
+    def add_energies(self, energies, times):
+        return {seconds: acc.add(energies, times) for seconds, acc in self.accumulators.items()}
+
+    # Feed raw blocks (n_blocks, block_size) with one timestamp per block
+    def add_blocks(self, blocks, times):
+        return self.add_energies(self.extractor.block_energies(blocks), times)
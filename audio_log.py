@@ -0,0 +1,333 @@
+import atexit
+import csv
+import glob
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+# Column layout of the audio log written by mic_store_new.py
+LOG_HEADERS = ["Timestamp", "Actual SPL (dB)", "Rate of Change", "Label (1=problematic,0=not problematic)", "Target Value"]
+
+_TAIL_BLOCK = 4096
+
+
+# Last complete line of a file, found by seeking backwards from the end: O(1) in the file length.
+# A trailing line without a newline is still being written by the logger and is skipped.
+def _read_last_line(file):
+    file.seek(0, os.SEEK_END)
+    end = file.tell()
+    data = b""
+    position = end
+    while position > 0:
+        step = min(_TAIL_BLOCK, position)
+        position -= step
+        file.seek(position)
+        data = file.read(step) + data
+        complete = data[:data.rfind(b"\n") + 1] if b"\n" in data else b""
+        lines = complete.rstrip(b"\r\n").split(b"\n")
+        # Need the newline that ends the last complete line *and* the one before it (or start of file)
+        if len(lines) >= 2 or (position == 0 and complete):
+            return lines[-1].decode("utf-8").rstrip("\r")
+    return None
+
+
+class LatestRowReader:
+    """Returns the newest row of a CSV log without parsing the rest of the file.
+
+    Each lookup re-stats the file; if size, mtime and inode are unchanged the
+    cached row is returned, otherwise only the tail of the file is read. Because
+    the position is always taken from the current end of file, truncation or a
+    full rewrite by the logger needs no special handling.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._stamp = None
+        self._row = None
+        self._headers = None
+
+    def latest(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self._stamp = self._row = None
+            return None
+        stamp = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        if stamp == self._stamp:
+            return self._row
+
+        with open(self.path, mode='rb') as file:
+            header_line = file.readline().decode("utf-8")
+            self._headers = next(csv.reader([header_line]), None)
+            last_line = _read_last_line(file)
+
+        row = None
+        if self._headers and last_line and last_line != header_line.rstrip("\r\n"):
+            values = next(csv.reader([last_line]), [])
+            if len(values) == len(self._headers):
+                row = dict(zip(self._headers, values))
+        self._stamp, self._row = stamp, row
+        return row
+
+
+# Segments are named audio_log.<YYYYmmdd-HHMMSS>_<sequence>.csv so name order is time order.
+# The pre-segmentation single file (audio_log.csv) is still read as the oldest segment.
+SEGMENT_PREFIX = "audio_log"
+LEGACY_LOG = "audio_log.csv"
+
+
+# All log files with a prefix in a folder, oldest first
+def list_segments(folder, prefix=SEGMENT_PREFIX, legacy_name=LEGACY_LOG):
+    segments = sorted(glob.glob(os.path.join(folder, f"{prefix}.*.csv")))
+    legacy = os.path.join(folder, legacy_name)
+    if os.path.exists(legacy):
+        segments.insert(0, legacy)
+    return segments
+
+
+class AudioLogWriter:
+    """Append-only, segmented audio log fed from the real-time audio thread.
+
+    write() never touches the disk: rows go onto a bounded queue (and are counted
+    as dropped if it is full). A background thread appends them through one
+    persistent file handle, flushing every flush_interval seconds. A new segment
+    file is started once the current one reaches segment_rows rows or
+    segment_seconds of age, and only the newest retention_segments files are
+    kept, so rotation and retention are O(1) instead of rewriting the log.
+    on_rotate(closed_segment_path) is called after each rotation. prefix and
+    headers select the log (the raw audio log by default, or the 1-minute levels).
+    """
+
+    def __init__(self, folder, segment_rows=5000, segment_seconds=3600, retention_segments=12,
+                 flush_interval=1.0, queue_size=4096, on_rotate=None, prefix=SEGMENT_PREFIX, headers=LOG_HEADERS):
+        self.folder = folder
+        self.prefix = prefix
+        self.headers = headers
+        self.segment_rows = segment_rows
+        self.segment_seconds = segment_seconds
+        self.retention_segments = retention_segments
+        self.flush_interval = flush_interval
+        self.on_rotate = on_rotate
+        self.rows = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.rows_written = 0
+
+        os.makedirs(folder, exist_ok=True)
+        self.segments = deque(sorted(glob.glob(os.path.join(folder, f"{prefix}.*.csv"))))
+        self._file = None
+        self._writer = None
+        self._segment_path = None
+        self._segment_rows = 0
+        self._segment_started = 0.0
+        self._sequence = 0
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=f"{prefix}-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # Called from the audio callback: enqueue only, never block
+    def write(self, row):
+        try:
+            self.rows.put_nowait(row)
+        except queue.Full:
+            self.dropped += 1
+
+    def _open_segment(self):
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        while True:
+            path = os.path.join(self.folder, f"{self.prefix}.{stamp}_{self._sequence:04d}.csv")
+            self._sequence += 1
+            if not os.path.exists(path):
+                break
+        self._file = open(path, mode='w', newline='')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(self.headers)
+        self._segment_path = path
+        self._segment_rows = 0
+        self._segment_started = time.time()
+        self.segments.append(path)
+
+    def _rotate(self):
+        closed = self._segment_path
+        self._file.close()
+        self._file = None
+        while len(self.segments) >= self.retention_segments:
+            try:
+                os.remove(self.segments.popleft())
+            except FileNotFoundError:
+                pass
+        self._open_segment()
+        if self.on_rotate is not None:
+            try:
+                self.on_rotate(closed)
+            except Exception as e:
+                print(f"Error in audio log rotation callback: {e}")
+
+    def _write_row(self, row):
+        if self._file is None:
+            self._open_segment()
+        elif (self._segment_rows >= self.segment_rows
+              or time.time() - self._segment_started >= self.segment_seconds):
+            self._rotate()
+        self._writer.writerow(row)
+        self._segment_rows += 1
+        self.rows_written += 1
+
+    def _run(self):
+        last_flush = time.monotonic()
+        while self._running or not self.rows.empty():
+            try:
+                self._write_row(self.rows.get(timeout=self.flush_interval))
+                # Drain whatever else is waiting before considering a flush
+                while True:
+                    self._write_row(self.rows.get_nowait())
+            except queue.Empty:
+                pass
+            if self._file is not None and time.monotonic() - last_flush >= self.flush_interval:
+                self._file.flush()
+                last_flush = time.monotonic()
+        if self._file is not None:
+            self._file.close()
+
+    def close(self):
+        if not self._running:
+            return
+        self._running = False
+        self._thread.join(timeout=5)
+
+
+class AudioLogReader:
+    """Read API over all audio log segments in a folder."""
+
+    def __init__(self, folder):
+        self.folder = folder
+        self._latest_readers = {}
+
+    def segments(self):
+        return list_segments(self.folder)
+
+    # Newest complete row across segments (a just-opened segment may only have its header)
+    def latest(self):
+        paths = self.segments()
+        if len(self._latest_readers) > len(paths):
+            self._latest_readers = {path: self._latest_readers[path] for path in paths if path in self._latest_readers}
+        for path in reversed(paths):
+            reader = self._latest_readers.get(path)
+            if reader is None:
+                reader = self._latest_readers[path] = LatestRowReader(path)
+            row = reader.latest()
+            if row is not None:
+                return row
+        return None
+
+    # All rows (optionally only the newest `max_segments` files) as one DataFrame, oldest first
+    def read(self, max_segments=None):
+        import pandas as pd
+
+        paths = self.segments()
+        if max_segments is not None:
+            paths = paths[-max_segments:]
+        frames = []
+        for path in paths:
+            try:
+                frame = pd.read_csv(path, on_bad_lines='skip')
+            except (FileNotFoundError, pd.errors.EmptyDataError):
+                continue  # Removed by retention (or just created) while we were listing
+            if not frame.empty:
+                frames.append(frame)
+        if not frames:
+            return pd.DataFrame(columns=LOG_HEADERS)
+        return pd.concat(frames, ignore_index=True)
+
+
+# 1-minute noise levels (LAeq, LZeq, LAmax, octave bands) written by mic_store_new.py, segmented and
+# pruned like the raw log (noise_levels.<YYYYmmdd-HHMMSS>_<sequence>.csv). The unsegmented
+# noise_levels.csv of older versions is still read as the oldest segment.
+LEVELS_PREFIX = "noise_levels"
+LEVELS_FILE = "noise_levels.csv"
+
+
+# Complete rows of one levels file; a trailing row without its newline is still being written
+def _read_level_rows(path):
+    import pandas as pd
+
+    try:
+        frame = pd.read_csv(path, on_bad_lines='skip')
+        with open(path, mode='rb') as file:
+            file.seek(0, os.SEEK_END)
+            if file.tell() > 0:
+                file.seek(-1, os.SEEK_END)
+                if file.read(1) != b"\n" and not frame.empty:
+                    frame = frame.iloc[:-1]
+    except (FileNotFoundError, pd.errors.EmptyDataError):
+        return None  # Removed by retention (or just created) while we were listing
+    return frame
+
+
+# "noise_levels.20250101-120000_0003.csv" -> "2025-01-01 12:00:00" (when the segment was opened)
+def _segment_started(path):
+    stamp = os.path.basename(path).split(".")[1].split("_")[0]
+    return f"{stamp[0:4]}-{stamp[4:6]}-{stamp[6:8]} {stamp[9:11]}:{stamp[11:13]}:{stamp[13:15]}"
+
+
+# Levels rows with a Timestamp later than `after` (all if None) as (DataFrame, cursor). The cursor is the
+# newest Timestamp returned (or `after` if nothing is new); pass it back in to get only newer rows.
+# Rows are stamped before they are written, so every row of a segment is older than the moment the next
+# segment was opened: segments followed by one opened at or before `after` are not read at all.
+def read_levels(folder, after=None):
+    import pandas as pd
+
+    paths = list_segments(folder, LEVELS_PREFIX, LEVELS_FILE)
+    if after is not None:
+        started = [_segment_started(path) for path in paths[1:]]
+        paths = [path for path, next_started in zip(paths, started + [None])
+                 if next_started is None or next_started > after]
+    frames = [frame for frame in map(_read_level_rows, paths) if frame is not None and not frame.empty]
+    if not frames:
+        return pd.DataFrame(), after
+    data = pd.concat(frames, ignore_index=True)
+    if after is not None:
+        data = data[data['Timestamp'].astype(str) > after].reset_index(drop=True)
+    return data, (str(data['Timestamp'].iloc[-1]) if len(data) else after)
+
+
+# Newest `n` complete lines of a file (fewer if it is shorter), read backwards from the end like
+# _read_last_line, and its header line
+def _read_tail_lines(path, n):
+    with open(path, mode='rb') as file:
+        header = file.readline()
+        file.seek(0, os.SEEK_END)
+        position = end = file.tell()
+        data = b""
+        while position > len(header) and data.count(b"\n") <= n:
+            step = min(_TAIL_BLOCK, position - len(header))
+            position -= step
+            file.seek(position)
+            data = file.read(step) + data
+    complete = data[:data.rfind(b"\n") + 1]  # A trailing partial row is still being written
+    lines = complete.split(b"\n")[:-1]
+    if position > len(header):
+        lines = lines[1:]  # The first line may be cut off by the block boundary
+    return header.decode("utf-8"), [line.decode("utf-8") for line in lines[-n:]] if end else []
+
+
+# Newest `n` levels rows across segments, oldest first (for a forecast, which only needs the last minutes)
+def read_levels_tail(folder, n):
+    import io
+    import pandas as pd
+
+    header, lines = None, []
+    for path in reversed(list_segments(folder, LEVELS_PREFIX, LEVELS_FILE)):
+        try:
+            segment_header, segment_lines = _read_tail_lines(path, n - len(lines))
+        except FileNotFoundError:
+            continue
+        header = header or segment_header
+        lines = segment_lines + lines
+        if len(lines) >= n:
+            break
+    if not header or not lines:
+        return pd.DataFrame()
+    return pd.read_csv(io.StringIO(header + "\n".join(lines) + "\n"), on_bad_lines='skip')
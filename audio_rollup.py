@@ -0,0 +1,183 @@
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+ROLLUP_FILE = "audio_rollup.db"
+# Bucket sizes in seconds and how long each tier is kept, so the database stays bounded:
+# about 173k 1 s rows, 130k 1 min rows and 44k 1 h rows at most
+TIERS = (1, 60, 3600)
+TIER_RETENTION = {1: 2 * 86400, 60: 90 * 86400, 3600: 5 * 365 * 86400}
+# Queries without an explicit tier use the finest one that returns at most this many buckets
+# (an hour at 1 s, a day at 1 min, a few months at 1 h)
+MAX_POINTS = 3600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollup (
+    tier INTEGER NOT NULL,    -- bucket size in seconds
+    bucket INTEGER NOT NULL,  -- epoch seconds of the start of the bucket
+    count INTEGER NOT NULL,   -- SPL readings in the bucket
+    spl_sum REAL NOT NULL,
+    spl_max REAL NOT NULL,
+    energy_sum REAL NOT NULL, -- sum of 10^(SPL/10), for Leq
+    PRIMARY KEY (tier, bucket)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+_UPSERT = """
+INSERT INTO rollup (tier, bucket, count, spl_sum, spl_max, energy_sum) VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT(tier, bucket) DO UPDATE SET
+    count = count + excluded.count,
+    spl_sum = spl_sum + excluded.spl_sum,
+    spl_max = max(spl_max, excluded.spl_max),
+    energy_sum = energy_sum + excluded.energy_sum
+"""
+
+
+class AudioRollup:
+    """1 s / 1 min / 1 h rollups (mean, max, Leq) of the SPL readings, in SQLite (WAL).
+
+    mic_store_new.py feeds every reading through add_many(). The open second
+    is accumulated in memory; when it closes, its sums are written to the 1 s
+    tier and added (upsert) to its 1 min and 1 h buckets in one transaction,
+    so all tiers are always current and nothing is recomputed from the raw log.
+    Each tier is trimmed to its retention period once an hour. Readers pick a
+    tier with query(), which by default uses the finest tier that covers the
+    requested range in at most MAX_POINTS buckets.
+    """
+
+    def __init__(self, path=ROLLUP_FILE, retention=None):
+        self.path = path
+        self.retention = dict(TIER_RETENTION, **(retention or {}))
+        self._local = threading.local()
+        self._connection().executescript(_SCHEMA)
+        self._second = None  # [bucket, count, spl_sum, spl_max, energy_sum] of the open second
+        self._retention_hour = None
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    # spl: SPL readings in dB, times: their epoch seconds (ascending). Writes every second that closed.
+    def add_many(self, spl, times):
+        spl = np.asarray(spl, dtype=np.float64)
+        if not len(spl):
+            return 0
+        seconds = np.floor(np.asarray(times, dtype=np.float64)).astype(np.int64)
+        starts = np.flatnonzero(np.r_[True, seconds[1:] != seconds[:-1]])
+        counts = np.diff(np.r_[starts, len(seconds)])
+        sums = np.add.reduceat(spl, starts)
+        maxima = np.maximum.reduceat(spl, starts)
+        energies = np.add.reduceat(10 ** (spl / 10), starts)
+
+        closed = []
+        for bucket, count, spl_sum, spl_max, energy_sum in zip(seconds[starts].tolist(), counts.tolist(),
+                                                                sums.tolist(), maxima.tolist(), energies.tolist()):
+            if self._second is not None and bucket != self._second[0]:
+                closed.append(tuple(self._second))
+                self._second = None
+            if self._second is None:
+                self._second = [bucket, count, spl_sum, spl_max, energy_sum]
+            else:
+                self._second[1] += count
+                self._second[2] += spl_sum
+                self._second[3] = max(self._second[3], spl_max)
+                self._second[4] += energy_sum
+        self._write(closed)
+        return len(closed)
+
+    # Write the open second as well (on shutdown or after an import)
+    def flush(self):
+        if self._second is not None:
+            self._write([tuple(self._second)])
+            self._second = None
+
+    def _write(self, seconds):
+        if not seconds:
+            return
+        connection = self._connection()
+        with connection:
+            for tier in TIERS:
+                connection.executemany(_UPSERT, [(tier, bucket // tier * tier, *sums) for bucket, *sums in seconds])
+        hour = seconds[-1][0] // 3600
+        if hour != self._retention_hour:
+            self._retention_hour = hour
+            self.apply_retention(seconds[-1][0])
+
+    # Delete buckets older than each tier's retention period
+    def apply_retention(self, now=None):
+        now = now if now is not None else time.time()
+        connection = self._connection()
+        with connection:
+            return sum(connection.execute("DELETE FROM rollup WHERE tier = ? AND bucket < ?",
+                                          (tier, int(now - self.retention[tier]))).rowcount for tier in TIERS)
+
+    # Finest tier with at most `max_points` buckets between start and end (epoch seconds)
+    def tier_for(self, start, end, max_points=MAX_POINTS):
+        for tier in TIERS:
+            if (end - start) / tier <= max_points:
+                return tier
+        return TIERS[-1]
+
+    # Buckets with start <= bucket < end as (tier, DataFrame of Timestamp (local time), bucket, count,
+    # mean, max, Leq), oldest first. The newest bucket of the 1 min and 1 h tiers is still filling up.
+    def query(self, start, end=None, tier=None, max_points=MAX_POINTS):
+        import pandas as pd
+
+        end = end if end is not None else time.time()
+        tier = tier if tier is not None else self.tier_for(start, end, max_points)
+        frame = pd.read_sql_query(
+            "SELECT bucket, count, spl_sum / count AS mean, spl_max AS max, energy_sum / count AS energy "
+            "FROM rollup WHERE tier = ? AND bucket >= ? AND bucket < ? ORDER BY bucket",
+            self._connection(), params=(tier, int(start) // tier * tier, int(end)))
+        frame['Leq'] = 10 * np.log10(frame.pop('energy'))
+        local_tz = datetime.now().astimezone().tzinfo
+        frame.insert(0, 'Timestamp', pd.to_datetime(frame['bucket'], unit='s', utc=True)
+                     .dt.tz_convert(local_tz).dt.tz_localize(None))
+        return tier, frame
+
+    # (bucket, count) of the newest bucket of a tier; changes whenever the tier does
+    def version(self, tier):
+        row = self._connection().execute(
+            "SELECT bucket, count FROM rollup WHERE tier = ? ORDER BY bucket DESC LIMIT 1", (tier,)).fetchone()
+        return (tier,) + tuple(row) if row else (tier,)
+
+    def count(self, tier):
+        return self._connection().execute("SELECT count(*) FROM rollup WHERE tier = ?", (tier,)).fetchone()[0]
+
+    def get_meta(self, key):
+        row = self._connection().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key, value):
+        connection = self._connection()
+        with connection:
+            connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    # One-off rollup of the raw audio log segments already on disk (Timestamp in local time, whole
+    # seconds). Returns the number of readings imported.
+    def migrate_log(self, reader):
+        import pandas as pd
+
+        if self.get_meta("migrated_log"):
+            return 0
+        frame = reader.read()
+        frame = frame.assign(Timestamp=pd.to_datetime(frame['Timestamp'], errors='coerce'),
+                             SPL=pd.to_numeric(frame['Actual SPL (dB)'], errors='coerce')).dropna(subset=['Timestamp', 'SPL'])
+        frame = frame.sort_values('Timestamp', kind='stable')
+        if len(frame):
+            local_tz = datetime.now().astimezone().tzinfo
+            times = frame['Timestamp'].dt.tz_localize(local_tz, ambiguous='NaT', nonexistent='NaT')
+            keep = times.notna().to_numpy()
+            self.add_many(frame['SPL'].to_numpy()[keep], (times[keep] - pd.Timestamp(0, tz='UTC')).dt.total_seconds().to_numpy())
+            self.flush()
+        self.set_meta("migrated_log", len(frame))
+        return len(frame)
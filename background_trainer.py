@@ -0,0 +1,72 @@
+import threading
+import time
+
+
+class BackgroundTrainer:
+    """Fits models on a worker thread and hot-swaps the in-memory model.
+
+    request() never blocks: it only flags that a retrain is wanted. The worker
+    waits `debounce` seconds after a request so bursts collapse into one fit,
+    and any requests that arrive while a fit is running are coalesced into a
+    single follow-up fit. train() returns the fitted model, or None if it failed
+    validation; only validated models replace the current one. Readers use
+    `model` and always get either the old or the new model, never a partial one.
+    """
+
+    def __init__(self, train, debounce=2.0, on_swap=None, name="trainer"):
+        self.train = train
+        self.debounce = debounce
+        self.on_swap = on_swap
+        self.name = name
+        self.stats = {"requests": 0, "fits": 0, "swaps": 0, "rejected": 0, "errors": 0}
+        self._model = None
+        self._lock = threading.Lock()
+        self._requested = threading.Event()
+        self._busy = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    @property
+    def model(self):
+        return self._model
+
+    @property
+    def busy(self):
+        return self._busy.is_set()
+
+    # Install a model directly (e.g. one loaded from disk at startup)
+    def set_model(self, model):
+        with self._lock:
+            self._model = model
+
+    def request(self):
+        self.stats["requests"] += 1
+        if self._requested.is_set() or self._busy.is_set():
+            print(f"{self.name}: retrain already pending, request coalesced")
+        self._requested.set()
+
+    def _run(self):
+        while True:
+            self._requested.wait()
+            time.sleep(self.debounce)
+            self._requested.clear()
+            self._busy.set()
+            try:
+                self.stats["fits"] += 1
+                model = self.train()
+                if model is None:
+                    self.stats["rejected"] += 1
+                    continue
+                with self._lock:
+                    self._model = model
+                self.stats["swaps"] += 1
+                if self.on_swap is not None:
+                    self.on_swap(model)
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"{self.name}: error during training: {e}")
+            finally:
+                self._busy.clear()
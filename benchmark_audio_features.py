@@ -0,0 +1,48 @@
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from audio_features import NoiseLevelMonitor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the noise feature extractor against the audio block budget.")
+    parser.add_argument("--samplerate", type=int, default=44100)
+    parser.add_argument("--block-size", type=int, default=2048)
+    parser.add_argument("--blocks", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=21)
+    args = parser.parse_args()
+
+    budget_ms = args.block_size / args.samplerate * 1000
+    rng = np.random.default_rng(0)
+    blocks = rng.normal(0, 0.05, size=(args.blocks, args.block_size)).astype(np.float32)
+    times = 1_700_000_000 + np.arange(args.blocks) * args.block_size / args.samplerate
+
+    # Per block, as in the audio callback: one block -> energies, then accumulate
+    monitor = NoiseLevelMonitor(args.samplerate, args.block_size)
+    per_block = []
+    for i in range(args.blocks):
+        t0 = time.perf_counter()
+        energies = monitor.extractor.block_energy(blocks[i][:, None])
+        monitor.add_energies(energies[None, :], times[i:i + 1])
+        per_block.append((time.perf_counter() - t0) * 1000)
+
+    # Batched, as the consumer thread sees it (~1 s of blocks at a time)
+    monitor = NoiseLevelMonitor(args.samplerate, args.block_size)
+    batched = []
+    for i in range(0, args.blocks, args.batch):
+        t0 = time.perf_counter()
+        monitor.add_blocks(blocks[i:i + args.batch], times[i:i + args.batch])
+        batched.append((time.perf_counter() - t0) * 1000 / len(blocks[i:i + args.batch]))
+
+    print(f"Block budget: {budget_ms:.1f} ms ({args.block_size} samples @ {args.samplerate} Hz)")
+    print(f"Per block:  median {statistics.median(per_block):.3f} ms, p99 {np.percentile(per_block, 99):.3f} ms "
+          f"({100 * statistics.median(per_block) / budget_ms:.2f}% of budget)")
+    print(f"Batched:    median {statistics.median(batched):.3f} ms/block "
+          f"({100 * statistics.median(batched) / budget_ms:.2f}% of budget)")
+
+
+if __name__ == "__main__":
+    main()
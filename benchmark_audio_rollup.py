@@ -0,0 +1,87 @@
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from audio_log import LOG_HEADERS, AudioLogReader
+from audio_rollup import AudioRollup
+
+ROWS_PER_SECOND = 21  # 44.1 kHz / 2048-sample blocks
+
+
+def timed_ms(function, repeats=3):
+    samples = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        result = function()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return min(samples), result
+
+
+# The graph data path before the rollups: parse every raw row, convert timestamps, sort
+def raw_graph_data(reader):
+    df = reader.read()
+    df['Timestamp'] = pd.to_datetime(df['Timestamp'])
+    df = df.sort_values(by='Timestamp')
+    return df['Timestamp'], df['Actual SPL (dB)']
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Graph data for a time range from the raw audio log vs the 1 s / 1 min / 1 h rollups.")
+    parser.add_argument("--hours", type=float, default=24, help="logged history, also the graph range")
+    parser.add_argument("--batch", type=int, default=2, help="readings per add_many call (the consumer wakes every 50 ms)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    rows = int(args.hours * 3600 * ROWS_PER_SECOND)
+    end = time.time()
+    times = end - args.hours * 3600 + np.arange(rows) / ROWS_PER_SECOND
+    spl = 45 + 5 * np.sin(times / 3000) + rng.standard_normal(rows)
+
+    with tempfile.TemporaryDirectory() as folder:
+        # Raw log as mic_store_new.py writes it (whole-second local timestamps), one segment per hour
+        stamps = pd.to_datetime(np.floor(times), unit='s', utc=True).tz_convert(
+            datetime.now().astimezone().tzinfo).strftime("%Y-%m-%d %H:%M:%S")
+        raw = pd.DataFrame({LOG_HEADERS[0]: stamps, LOG_HEADERS[1]: spl.round(6), LOG_HEADERS[2]: 0.0,
+                            LOG_HEADERS[3]: (spl >= 55).astype(int), LOG_HEADERS[4]: spl.round(6)})
+        per_segment = 3600 * ROWS_PER_SECOND
+        for i, start in enumerate(range(0, rows, per_segment)):
+            raw.iloc[start:start + per_segment].to_csv(os.path.join(folder, f"audio_log.20250101-{i:06d}_0000.csv"), index=False)
+        raw_mb = sum(os.path.getsize(os.path.join(folder, name)) for name in os.listdir(folder)) / 1e6
+        reader = AudioLogReader(folder)
+
+        # Incremental ingestion in consumer-sized batches
+        rollup = AudioRollup(os.path.join(folder, "audio_rollup.db"))
+        t0 = time.perf_counter()
+        for start in range(0, rows, args.batch):
+            rollup.add_many(spl[start:start + args.batch], times[start:start + args.batch])
+        rollup.flush()
+        ingest_s = time.perf_counter() - t0
+        rollup_mb = sum(os.path.getsize(os.path.join(folder, name)) for name in os.listdir(folder)
+                        if name.startswith("audio_rollup")) / 1e6
+
+        start = end - args.hours * 3600
+        raw_ms, (raw_x, _) = timed_ms(lambda: raw_graph_data(reader), repeats=1)
+        print(f"{args.hours:g} h of readings: {rows} raw rows ({raw_mb:.0f} MB CSV), rollup database {rollup_mb:.1f} MB")
+        print(f"ingestion: {ingest_s / (args.hours * 3600) * 1000:.3f} ms of CPU per logged second "
+              f"({ingest_s:.1f} s total, batches of {args.batch})")
+        print(f"{'graph data':<26}{'points':>10}{'ms':>10}")
+        print(f"{'raw log':<26}{len(raw_x):>10}{raw_ms:>10.0f}")
+        tier = rollup.tier_for(start, end)
+        for label, chosen in ((f"rollup auto ({tier} s tier)", None), ("rollup 1 s tier", 1), ("rollup 1 h tier", 3600)):
+            query_ms, (_, frame) = timed_ms(lambda: rollup.query(start, end, tier=chosen))
+            print(f"{label:<26}{len(frame):>10}{query_ms:>10.1f}")
+
+        # Combining the 1 h buckets gives the same mean, Leq and max as the raw readings
+        _, frame = rollup.query(start, end, tier=3600)
+        leq = 10 * np.log10(np.sum(10 ** (frame['Leq'] / 10) * frame['count']) / frame['count'].sum())
+        print(f"check: mean {np.sum(frame['mean'] * frame['count']) / frame['count'].sum():.4f} vs {spl.mean():.4f}, "
+              f"Leq {leq:.4f} vs {10 * np.log10(np.mean(10 ** (spl / 10))):.4f}, max {frame['max'].max():.3f} vs {spl.max():.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+CHARTS = ["pm", "sound", "violations"]
+
+
+# Synthetic data of the three graphs: 30 PM readings, `sound_points` 1 s SPL rows, `days` of violation buckets
+def make_data(sound_points, days):
+    rng = np.random.default_rng(0)
+    now_ms = int(time.time() * 1000)
+    pm = ([now_ms - (30 - i) * 5000 for i in range(30)], list(np.round(rng.gamma(4, 3, 30), 1)))
+    times = pd.Series(pd.date_range("2025-01-01", periods=sound_points, freq="s"))
+    sound = (times, pd.Series(45 + 8 * rng.standard_normal(sound_points)))
+    series = {"no_mask": ([], [], []), "no_earmuff": ([], [], [])}
+    for day in range(days):
+        for hour in range(24):
+            for name in series:
+                count = int(rng.poisson(1.5))
+                if count:
+                    series[name][0].append(hour + 0.5)
+                    series[name][1].append(date(2025, 1, 1) + timedelta(days=day))
+                    series[name][2].append(20 + 10 * count)
+    return {"pm": pm, "sound": sound, "violations": series}
+
+
+# Previous path: a new pyplot figure per request, tight_layout, savefig to a file, read the file back
+def pyplot_render(chart, data, path):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    if chart == "violations":
+        plt.figure(figsize=(12, 6))
+        plt.scatter(data["no_mask"][0], data["no_mask"][1], s=data["no_mask"][2], c='r', alpha=0.6, label="No Mask Violations")
+        plt.scatter(data["no_earmuff"][0], data["no_earmuff"][1], s=data["no_earmuff"][2], c='b', alpha=0.6, label="No Earmuff Violations")
+        plt.xticks(range(0, 25, 2), rotation=45)
+        plt.xlim(0, 24)
+        plt.legend()
+    else:
+        x, y = data
+        if chart == "pm":
+            x = pd.to_datetime(x, unit="ms")
+        plt.figure(figsize=(10, 5))
+        plt.plot(x, y, marker='o' if chart == "pm" else None, linestyle='-', label='SPL (dB)')
+        plt.xticks(rotation=45)
+        plt.grid(True)
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.close()
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def shared_renderer():
+    from graph_renderer import GraphRenderer, LineChart, ScatterChart
+
+    renderer = GraphRenderer()
+    renderer.add_chart("pm", lambda: LineChart("PM2.5 Readings Over Time", "PM2.5 (ug/m3)", marker='o'))
+    renderer.add_chart("sound", lambda: LineChart('Sound Level Over Time', 'Decibel (dB)', label='SPL (dB)', color='b'))
+    renderer.add_chart("violations", lambda: ScatterChart(
+        "Violations Graph (No Mask and No Earmuff)", "Time (Hours of the Day)", "Date",
+        {"no_mask": ("No Mask Violations", 'r'), "no_earmuff": ("No Earmuff Violations", 'b')},
+        xlim=(0, 24), xticks=range(0, 25, 2)))
+    return renderer
+
+
+# One measurement in a fresh interpreter so peak RSS belongs to this path alone
+def measure(path, chart, repeats, sound_points, days):
+    data = make_data(sound_points, days)[chart]
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if path == "pyplot":
+        folder = tempfile.mkdtemp()
+        request = lambda: pyplot_render(chart, data, os.path.join(folder, "graph.png"))
+    else:
+        renderer = shared_renderer()
+        # Version None: every request renders, as a request for new data would
+        request = lambda: renderer.render(chart, lambda: (None, data))
+
+    first_t0 = time.perf_counter()
+    size = len(request())
+    first_ms = (time.perf_counter() - first_t0) * 1000
+    samples = []
+    tracemalloc.start()
+    for _ in range(repeats):
+        tracemalloc.reset_peak()
+        t0 = time.perf_counter()
+        request()
+        samples.append((time.perf_counter() - t0) * 1000)
+    python_peak_kb = tracemalloc.get_traced_memory()[1] / 1024
+    tracemalloc.stop()
+    return {"first_ms": first_ms, "median_ms": statistics.median(samples), "python_peak_kb": python_peak_kb,
+            "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            "rss_growth_mb": (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024, "png_kb": size / 1024}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-request graph render time and memory: new pyplot figure + PNG file vs the shared in-memory renderer.")
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--sound-points", type=int, default=3600, help="rows in the sound graph (1 s each)")
+    parser.add_argument("--days", type=int, default=30, help="days of violation buckets")
+    parser.add_argument("--measure", nargs=2, metavar=("PATH", "CHART"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(*args.measure, args.repeats, args.sound_points, args.days)))
+        return
+
+    print(f"{'graph':<12}{'path':<10}{'first ms':>10}{'per request ms':>16}{'py peak KB':>12}{'RSS growth MB':>15}{'PNG KB':>8}")
+    for chart in CHARTS:
+        for path in ("pyplot", "shared"):
+            output = subprocess.run([sys.executable, __file__, "--measure", path, chart, "--repeats", str(args.repeats),
+                                     "--sound-points", str(args.sound_points), "--days", str(args.days)],
+                                    capture_output=True, text=True, check=True).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{chart:<12}{path:<10}{result['first_ms']:>10.0f}{result['median_ms']:>16.1f}"
+                  f"{result['python_peak_kb']:>12.0f}{result['rss_growth_mb']:>15.1f}{result['png_kb']:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from feature_engineering import create_lag_features
+
+
+# The previous implementation (copied from mic_sensor_ml.py / pm_sensor_ML.py) used as the reference
+def create_lag_features_loop(df, window=3, horizon=5, target_col='national'):
+    X, y = [], []
+    for i in range(len(df) - window - horizon):
+        chunk = df.iloc[i:i + window].values.flatten()
+        X.append(chunk)
+        y.append(df.iloc[i + window + horizon][target_col])
+    return pd.DataFrame(X), pd.Series(y)
+
+
+# Synthetic PSI-style frame with the same feature columns as pm_sensor_ML.py
+def make_frame(rows, rng):
+    hours = pd.date_range("2016-01-01", periods=rows, freq="h")
+    return pd.DataFrame({
+        "national": rng.normal(55, 12, rows).round(1),
+        "year": hours.year,
+        "month": hours.month,
+        "day": hours.day,
+        "hour": hours.hour,
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vectorized lag-feature construction against the iloc loop.")
+    parser.add_argument("--rows", nargs="+", type=int, default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--loop-limit", type=int, default=100_000,
+                        help="largest size the loop is run on; bigger sizes are extrapolated from this one")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'rows':>10}{'loop s':>12}{'vectorized s':>14}{'speedup':>10}")
+    loop_rate = None
+    for rows in args.rows:
+        df = make_frame(rows, rng)
+
+        t0 = time.perf_counter()
+        X, y = create_lag_features(df, window=3, horizon=5, target_cols='national')
+        vector_s = time.perf_counter() - t0
+
+        if rows <= args.loop_limit:
+            t0 = time.perf_counter()
+            X_ref, y_ref = create_lag_features_loop(df, window=3, horizon=5)
+            loop_s = time.perf_counter() - t0
+            loop_rate = loop_s / rows
+            pd.testing.assert_frame_equal(X, X_ref)
+            pd.testing.assert_series_equal(y, y_ref)
+            loop_label = f"{loop_s:.2f}"
+        elif loop_rate is not None:
+            loop_s = loop_rate * rows
+            loop_label = f"~{loop_s:.0f} (est.)"
+        else:
+            print(f"{rows:>10}{'-':>12}{vector_s:>14.4f}")
+            continue
+        print(f"{rows:>10}{loop_label:>12}{vector_s:>14.4f}{loop_s / vector_s:>9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import argparse
+import csv
+import os
+import statistics
+import tempfile
+import time
+
+import pandas as pd
+
+from audio_log import LOG_HEADERS, LatestRowReader
+
+
+# Write a synthetic audio log with the same layout as mic_store_new.py
+def write_log(path, rows):
+    with open(path, mode='w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(LOG_HEADERS)
+        for i in range(rows):
+            spl = 30 + (i % 400) / 10
+            writer.writerow([f"2025-03-29 {i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}", spl, 0.1, 0, spl])
+
+
+# The old get_latest_sound_level path
+def pandas_latest(path):
+    latest_row = pd.read_csv(path).iloc[-1]
+    return float(latest_row["Actual SPL (dB)"])
+
+
+def tail_latest(path):
+    # A fresh reader per call so the stat cache never short-circuits the measurement
+    return float(LatestRowReader(path).latest()["Actual SPL (dB)"])
+
+
+def time_call(func, path, repeats):
+    samples = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        func(path)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark latest-sound-level lookup: pandas read_csv vs tail seek.")
+    parser.add_argument("--rows", nargs="+", type=int, default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        print(f"{'rows':>10}{'pandas ms':>12}{'tail ms':>10}{'speedup':>10}")
+        for rows in args.rows:
+            path = os.path.join(folder, f"audio_log_{rows}.csv")
+            write_log(path, rows)
+            assert pandas_latest(path) == tail_latest(path)
+            pandas_ms = time_call(pandas_latest, path, args.repeats)
+            tail_ms = time_call(tail_latest, path, args.repeats)
+            print(f"{rows:>10}{pandas_ms:>12.2f}{tail_ms:>10.3f}{pandas_ms / tail_ms:>9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
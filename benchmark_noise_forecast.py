@@ -0,0 +1,70 @@
+import argparse
+import statistics
+import time
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+from benchmark_noise_training import make_levels
+from feature_engineering import create_lag_features
+from noise_forecaster import NoiseForecaster, minute_features
+
+
+# The previous predict_time_to_50dB loop: one forest evaluation per step, feeding back only SPL and time
+def recursive_time_to_threshold(model, input_data, threshold=50, max_steps=120):
+    input_data = input_data.copy()
+    predicted_time = 0
+    while input_data[0, 0] < threshold:
+        predicted_spl = model.predict(input_data)[0]
+        predicted_time += 1
+        input_data[0, 2] += 1
+        input_data[0, 0] = predicted_spl
+        if predicted_time > max_steps:
+            return None
+    return predicted_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency of the direct multi-horizon forecast against the recursive loop.")
+    parser.add_argument("--days", type=float, default=3)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--threshold", type=float, default=50.0)
+    args = parser.parse_args()
+
+    levels = make_levels(int(args.days * 1440), np.random.default_rng(0))
+
+    # Recursive baseline: 100-tree forest on [SPL, rate of change, minutes] x 3 lags, as before
+    old = levels[["LZeq"]].rename(columns={"LZeq": "Actual SPL (dB)"})
+    old["Rate of Change"] = old["Actual SPL (dB)"].diff().fillna(0)
+    old["Minutes"] = np.arange(len(old), dtype=float)
+    X_old, y_old = create_lag_features(old, window=3, horizon=5, target_cols='Actual SPL (dB)')
+    recursive_model = RandomForestRegressor(n_estimators=100, random_state=42).fit(X_old.to_numpy(), y_old)
+
+    direct = NoiseForecaster.empty(trees_per_update=100, max_members=1).updated(levels)
+    features = minute_features(levels)
+
+    # Start points below the threshold where the loop has to walk forward
+    starts = [i for i in range(direct.window, len(levels), len(levels) // args.repeats)
+              if levels["LZeq"].iloc[i - 1] < args.threshold][:args.repeats]
+    recursive_ms, direct_ms, steps = [], [], []
+    for end in starts:
+        x_old = old.iloc[end - 3:end].to_numpy().reshape(1, -1)
+        t0 = time.perf_counter()
+        crossing = recursive_time_to_threshold(recursive_model, x_old, args.threshold)
+        recursive_ms.append((time.perf_counter() - t0) * 1000)
+        steps.append(crossing if crossing is not None else 121)
+
+        x_new = features.iloc[end - direct.window:end].to_numpy().reshape(1, -1)
+        t0 = time.perf_counter()
+        direct.forecast(x_new, threshold=args.threshold)
+        direct_ms.append((time.perf_counter() - t0) * 1000)
+
+    print(f"{len(starts)} forecasts, recursive loop ran {statistics.mean(steps):.0f} forest evaluations on average")
+    print(f"Recursive loop:  median {statistics.median(recursive_ms):8.1f} ms, max {max(recursive_ms):8.1f} ms")
+    print(f"Direct forecast: median {statistics.median(direct_ms):8.1f} ms, max {max(direct_ms):8.1f} ms "
+          f"(120 horizons + 10/90% band from {len(direct.ensemble.estimators_)} trees)")
+    print(f"Speedup: {statistics.median(recursive_ms) / statistics.median(direct_ms):.0f}x")
+
+
+if __name__ == "__main__":
+    main()
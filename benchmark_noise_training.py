@@ -0,0 +1,95 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from audio_log import read_levels
+from feature_engineering import create_horizon_features
+from noise_forecaster import TARGET_COL, NoiseForecaster, minute_features
+
+
+# Synthetic noise_levels.csv: louder during working hours, AR(1) minute-to-minute variation, machinery bursts
+def make_levels(minutes, rng):
+    timestamps = pd.date_range("2025-01-06", periods=minutes, freq="min")
+    hour = timestamps.hour + timestamps.minute / 60
+    working = ((hour >= 8) & (hour < 18)).astype(float)
+    variation = np.zeros(minutes)
+    shocks = rng.normal(0, 1.2, minutes)
+    for i in range(1, minutes):
+        variation[i] = 0.95 * variation[i - 1] + shocks[i]
+    bursts = np.convolve(rng.random(minutes) < 0.01, np.ones(15), mode="same") * 6 * working
+    lzeq = 40 + 9 * working + variation + bursts
+    return pd.DataFrame({
+        "Timestamp": timestamps.strftime("%Y-%m-%d %H:%M:%S"),
+        "LAeq": lzeq - 4 + rng.normal(0, 0.5, minutes),
+        "LZeq": lzeq,
+        "LAmax": lzeq + 8 + rng.normal(0, 1.5, minutes),
+    })
+
+
+# Mean absolute error over all horizons of a forecaster on the samples contained in `data`
+def forecast_mae(forecaster, data):
+    X, Y = create_horizon_features(minute_features(data), window=forecaster.window,
+                                   horizons=forecaster.horizons, target_col=TARGET_COL)
+    complete = X.notna().all(axis=1) & Y.notna().all(axis=1)
+    if not complete.any():
+        return float("nan")
+    return float(np.mean(np.abs(forecaster.ensemble.predict(X[complete].to_numpy()) - Y[complete].to_numpy())))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare incremental forecaster updates with full refits on 1-minute noise levels.")
+    parser.add_argument("--levels-folder", help="replay the real noise_levels segments in this folder (e.g. audio_logs) instead of synthetic data")
+    parser.add_argument("--days", type=float, default=4)
+    parser.add_argument("--chunk-minutes", type=int, default=240, help="new minutes between two retrains")
+    parser.add_argument("--trees-per-update", type=int, default=20)
+    parser.add_argument("--max-members", type=int, default=8)
+    args = parser.parse_args()
+
+    if args.levels_folder:
+        levels, _ = read_levels(args.levels_folder)
+    else:
+        levels = make_levels(int(args.days * 1440), np.random.default_rng(0))
+    chunks = [levels.iloc[i:i + args.chunk_minutes] for i in range(0, len(levels), args.chunk_minutes)]
+    if len(chunks) < 3:
+        raise SystemExit("Need at least 3 chunks of levels")
+
+    incremental = NoiseForecaster.empty(args.trees_per_update, args.max_members)
+    print(f"{'update':>6}{'minutes':>9}{'full cpu s':>12}{'incr cpu s':>12}{'full MAE':>10}{'incr MAE':>10}{'trees':>7}")
+    totals = {"full": 0.0, "incremental": 0.0}
+    errors = {"full": [], "incremental": []}
+    # Fit after each chunk, score on the chunk that follows (as the live system would)
+    for i in range(len(chunks) - 1):
+        history = levels.iloc[:(i + 1) * args.chunk_minutes]
+
+        t0 = time.process_time()
+        full = NoiseForecaster.empty(100, 1).updated(history)
+        full_s = time.process_time() - t0
+
+        t0 = time.process_time()
+        candidate = incremental.updated(chunks[i])
+        incr_s = time.process_time() - t0
+        if candidate is not None:
+            incremental = candidate
+
+        if full is None or not incremental.trained:
+            print(f"{i + 1:>6}{len(history):>9}   (not enough data yet)")
+            continue
+        totals["full"] += full_s
+        totals["incremental"] += incr_s
+        full_mae = forecast_mae(full, chunks[i + 1])
+        incr_mae = forecast_mae(incremental, chunks[i + 1])
+        errors["full"].append(full_mae)
+        errors["incremental"].append(incr_mae)
+        print(f"{i + 1:>6}{len(history):>9}{full_s:>12.2f}{incr_s:>12.2f}{full_mae:>10.3f}{incr_mae:>10.3f}"
+              f"{len(incremental.ensemble.estimators_):>7}")
+
+    print(f"\nTotal CPU: full {totals['full']:.1f} s, incremental {totals['incremental']:.1f} s "
+          f"({totals['full'] / totals['incremental']:.1f}x less)")
+    print(f"Mean next-chunk MAE (all horizons): full {np.nanmean(errors['full']):.3f} dB, "
+          f"incremental {np.nanmean(errors['incremental']):.3f} dB")
+
+
+if __name__ == "__main__":
+    main()
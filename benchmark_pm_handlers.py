@@ -0,0 +1,81 @@
+import argparse
+import csv
+import json
+import os
+import statistics
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from pm_recent import RecentReadings
+from pm_store import PMStore, format_timestamp
+
+
+def timed_us(function, repeats):
+    samples = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - t0) * 1e6)
+    return statistics.median(samples)
+
+
+# topic/getPM as it was: parse the whole CSV, sort, take 5, convert timestamps, serialize
+def csv_get_pm(path):
+    df = pd.read_csv(path, parse_dates=["timestamp"])
+    df = df.sort_values(by="timestamp")
+    last_5 = df.tail(5).to_dict(orient="records")
+    for row in last_5:
+        if isinstance(row["timestamp"], pd.Timestamp):
+            row["timestamp"] = row["timestamp"].strftime("%Y-%m-%d %H:%M:%S")
+    return json.dumps(last_5)
+
+
+# topic/getPM on the SQLite store (index lookup + serialization per request)
+def store_get_pm(store):
+    return json.dumps([{"timestamp": format_timestamp(row["ts"]), "status": row["status"], "pm2_5": row["pm2_5"]}
+                       for row in store.last(5)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency of the topic/getPM and graph-data handlers: CSV, SQLite store, in-memory buffer.")
+    parser.add_argument("--days", nargs="+", type=float, default=[1, 7])
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'days':>5}{'rows':>9}{'CSV getPM us':>15}{'store getPM us':>16}{'memory getPM us':>17}"
+          f"{'CSV graph data us':>19}{'memory graph data us':>22}")
+    for days in args.days:
+        with tempfile.TemporaryDirectory() as folder:
+            rows = int(days * 86400 / 5)
+            now_ms = int(time.time() * 1000)
+            timestamps = [now_ms - (rows - i) * 5000 for i in range(rows)]
+            values = np.round(rng.gamma(4, 3, rows), 1)
+
+            csv_path = os.path.join(folder, "pm_readings.csv")
+            with open(csv_path, mode='w', newline='') as file:
+                writer = csv.writer(file)
+                writer.writerow(["timestamp", "status", "pm2_5"])
+                writer.writerows([format_timestamp(ts), "LOW", v] for ts, v in zip(timestamps, values))
+            store = PMStore(os.path.join(folder, "pm.db"))
+            store.add_many([{"pm2_5": v, "status": "LOW"} for v in values], timestamps)
+            recent = RecentReadings(capacity=30, reply_size=5)
+            recent.seed(store)
+            assert json.loads(recent.reply()) == json.loads(store_get_pm(store))
+
+            csv_repeats = max(3, args.repeats // 50)
+            csv_us = timed_us(lambda: csv_get_pm(csv_path), csv_repeats)
+            store_us = timed_us(lambda: store_get_pm(store), args.repeats)
+            memory_us = timed_us(recent.reply, args.repeats)
+            csv_graph_us = timed_us(lambda: pd.read_csv(csv_path, parse_dates=["timestamp"])
+                                    .sort_values(by="timestamp").tail(30), csv_repeats)
+            memory_graph_us = timed_us(lambda: recent.latest(30), args.repeats)
+            print(f"{days:>5g}{rows:>9}{csv_us:>15.0f}{store_us:>16.1f}{memory_us:>17.2f}"
+                  f"{csv_graph_us:>19.0f}{memory_graph_us:>22.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import argparse
+import csv
+import os
+import statistics
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from pm_store import PMStore, format_timestamp
+
+READING_SECONDS = 5
+
+
+def timed(function, repeats):
+    samples = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+# The previous topic/getPM path on pm_readings.csv
+def csv_last_5(path):
+    df = pd.read_csv(path, parse_dates=["timestamp"])
+    df = df.sort_values(by="timestamp")
+    return df.tail(5).to_dict(orient="records")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query latency of the PM SQLite store as history grows, against the CSV log.")
+    parser.add_argument("--days", nargs="+", type=int, default=[7, 30, 90])
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--csv-limit-days", type=int, default=30, help="largest history the CSV path is timed on")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'days':>5}{'rows':>10}{'last 5 ms':>11}{'1 h range':>11}{'1 d hourly':>12}{'ml view':>9}{'insert ms':>11}{'CSV last 5':>12}")
+    with tempfile.TemporaryDirectory() as folder:
+        store = PMStore(os.path.join(folder, "pm.db"), raw_retention_days=max(args.days) + 1)
+        csv_path = os.path.join(folder, "pm_readings.csv")
+        with open(csv_path, mode='w', newline='') as file:
+            csv.writer(file).writerow(["timestamp", "status", "pm2_5"])
+
+        now_ms = int(time.time() * 1000)
+        start_ms = now_ms - max(args.days) * 86400 * 1000
+        written_until = start_ms
+        for days in sorted(args.days):
+            # Grow the history to `days` of 5 s readings
+            end_ms = start_ms + days * 86400 * 1000
+            timestamps = list(range(written_until, end_ms, READING_SECONDS * 1000))
+            values = np.round(rng.gamma(4, 3, len(timestamps)), 1)
+            store.add_many([{"pm2_5": v, "pm1_0": v * 0.7, "pm10": v * 1.3, "status": "LOW"} for v in values], timestamps)
+            if days <= args.csv_limit_days:
+                with open(csv_path, mode='a', newline='') as file:
+                    writer = csv.writer(file)
+                    writer.writerows([format_timestamp(ts), "LOW", v] for ts, v in zip(timestamps, values))
+            written_until = end_ms
+
+            last_ms = timed(lambda: store.last(5), args.repeats)
+            range_ms = timed(lambda: store.range(end_ms - 3600_000, end_ms), args.repeats)
+            hourly_ms = timed(lambda: store.hourly(end_ms // 1000 - 86400, end_ms // 1000), args.repeats)
+            view_ms = timed(lambda: store.ml_features(closed_only=False, last=3), args.repeats)
+            ts = [end_ms + i * 1000 for i in range(args.repeats)]
+            insert_ms = timed(lambda: store.add({"pm2_5": 10.0, "status": "LOW"}, ts.pop()), args.repeats)
+            csv_ms = f"{timed(lambda: csv_last_5(csv_path), 3):.1f}" if days <= args.csv_limit_days else "-"
+            print(f"{days:>5}{store.count():>10}{last_ms:>11.3f}{range_ms:>11.2f}{hourly_ms:>12.3f}{view_ms:>9.2f}"
+                  f"{insert_ms:>11.3f}{csv_ms:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import argparse
+import io
+import random
+import struct
+import time
+
+from pms5003 import FRAME_SIZE, PMS5003Parser, encode_frame, replay
+
+
+# Capture of `frames` valid frames with line noise, corrupted and truncated frames mixed in.
+# Returns the bytes and the list of PM2.5 (atm) values of the frames that are intact.
+def make_capture(frames, error_rate, rng):
+    capture = bytearray()
+    expected = []
+    for i in range(frames):
+        pm2_5 = 5 + i % 40
+        frame = encode_frame((pm2_5 - 2, pm2_5, pm2_5 + 3, pm2_5 - 2, pm2_5, pm2_5 + 3), (900, 300, 80, 10, 2, 1))
+        roll = rng.random()
+        if roll < error_rate:
+            capture += bytes(rng.randrange(256) for _ in range(rng.randrange(1, 40)))  # line noise
+        if roll > 1 - error_rate / 2:
+            corrupted = bytearray(frame)
+            corrupted[rng.randrange(4, FRAME_SIZE - 2)] ^= 1 << rng.randrange(8)
+            frame = bytes(corrupted)
+        elif roll > 1 - error_rate:
+            frame = frame[:rng.randrange(2, FRAME_SIZE - 1)]  # dropped tail
+        else:
+            expected.append(pm2_5)
+        capture += frame
+    return bytes(capture), expected
+
+
+# The previous pm_sensor.py loop: 2-byte header check, 30-byte read, no checksum (and index 4 = PM1.0)
+def legacy_parse(stream):
+    values = []
+    while True:
+        header = stream.read(2)
+        if len(header) < 2:
+            return values
+        if header == b'\x42\x4D':
+            frame = stream.read(30)
+            if len(frame) != 30:
+                continue
+            data = struct.unpack(">HHHHHHHHHHHHHH", frame[:28])
+            values.append(data[5])  # PM2.5 (atm), the field the old code meant to read
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the PMS5003 stream parser against the old fixed-offset read loop.")
+    parser.add_argument("--capture", help="benchmark a recorded binary capture instead of a synthetic one")
+    parser.add_argument("--frames", type=int, default=100_000)
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--chunk-size", type=int, default=64)
+    parser.add_argument("--write-capture", help="also write the synthetic capture here (for PMS_REPLAY_FILE)")
+    args = parser.parse_args()
+
+    if args.capture:
+        capture = b"".join(replay(args.capture, chunk_size=1 << 16))
+        expected = None
+    else:
+        capture, expected = make_capture(args.frames, args.error_rate, random.Random(0))
+        if args.write_capture:
+            with open(args.write_capture, mode='wb') as file:
+                file.write(capture)
+
+    stream_parser = PMS5003Parser()
+    t0 = time.perf_counter()
+    frames = []
+    for i in range(0, len(capture), args.chunk_size):
+        frames += stream_parser.feed(capture[i:i + args.chunk_size])
+    parser_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    legacy = legacy_parse(io.BytesIO(capture))
+    legacy_s = time.perf_counter() - t0
+
+    parsed = [frame["pm2_5_atm"] for frame in frames]
+    print(f"Capture: {len(capture)} bytes")
+    print(f"Stream parser: {len(frames)} frames in {parser_s:.3f} s "
+          f"({len(frames) / parser_s:,.0f} frames/s, {parser_s / max(len(frames), 1) * 1e6:.1f} us/frame), {stream_parser.stats}")
+    print(f"Old read loop: {len(legacy)} frames in {legacy_s:.3f} s")
+    if expected is not None:
+        print(f"Intact frames in capture: {len(expected)}")
+        print(f"  stream parser: {len(parsed)} frames, identical to the intact ones: {parsed == expected}")
+        out_of_range = sum(1 for value in legacy if not 5 <= value < 45)
+        print(f"  old read loop: {len(legacy)} frames ({len(legacy) / len(expected):.0%}), "
+              f"{out_of_range} with values that were never sent")
+
+
+if __name__ == "__main__":
+    main()
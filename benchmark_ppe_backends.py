@@ -0,0 +1,84 @@
+import argparse
+import multiprocessing as mp
+import resource
+import statistics
+import time
+
+import numpy as np
+
+
+# Runs in a fresh process so load time and peak memory are measured per backend
+def run_backend(backend, variant, threads, folder, limit, batch_size, results):
+    started = time.perf_counter()
+    from ppe_inference import load_ppe_engine, load_sample_frames, preprocess_frames
+
+    engine = load_ppe_engine(backend, variant=variant, num_threads=threads)
+    load_time = time.perf_counter() - started
+    if backend != "keras" and engine.backend != "tflite":
+        results.put({"backend": f"{backend}-{variant}", "error": "no converted artifacts found"})
+        return
+
+    frames = load_sample_frames(folder, limit)
+    batch = preprocess_frames(frames)
+    engine.predict_raw(batch[:1])  # warm-up / graph tracing
+
+    single = []
+    mask_classes, earmuff_classes = [], []
+    for i in range(len(batch)):
+        t0 = time.perf_counter()
+        mask_pred, earmuff_pred = engine.predict_raw(batch[i:i + 1])
+        single.append((time.perf_counter() - t0) * 1000)
+        mask_classes.append(int(np.argmax(mask_pred[0])))
+        earmuff_classes.append(int(np.argmax(earmuff_pred[0])))
+
+    batched = []
+    for i in range(0, len(batch), batch_size):
+        t0 = time.perf_counter()
+        engine.predict_raw(batch[i:i + batch_size])
+        batched.append((time.perf_counter() - t0) * 1000 / len(batch[i:i + batch_size]))
+
+    results.put({
+        "backend": engine.backend if engine.backend == "keras" else f"tflite-{variant}",
+        "load_s": load_time,
+        "single_ms": statistics.median(single),
+        "batched_ms": statistics.median(batched),
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "mask": mask_classes,
+        "earmuff": earmuff_classes,
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare latency, memory and agreement of the PPE inference backends.")
+    parser.add_argument("frames", help="folder of sample frames (jpg/png)")
+    parser.add_argument("--variants", nargs="+", default=["float16", "int8"])
+    parser.add_argument("--threads", type=int, default=2)
+    parser.add_argument("--limit", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=8)
+    args = parser.parse_args()
+
+    ctx = mp.get_context("spawn")
+    runs = [("keras", None)] + [("tflite", variant) for variant in args.variants]
+    reports = []
+    for backend, variant in runs:
+        results = ctx.Queue()
+        proc = ctx.Process(target=run_backend, args=(backend, variant or "int8", args.threads,
+                                                     args.frames, args.limit, args.batch_size, results))
+        proc.start()
+        reports.append(results.get())
+        proc.join()
+
+    reference = reports[0]
+    print(f"{'backend':<16}{'load s':>8}{'1-frame ms':>12}{'batched ms/img':>16}{'peak RSS MB':>13}{'mask agree':>12}{'earmuff agree':>15}")
+    for report in reports:
+        if "error" in report:
+            print(f"{report['backend']:<16}  skipped: {report['error']}")
+            continue
+        mask_agree = np.mean(np.array(report["mask"]) == np.array(reference["mask"])) * 100
+        earmuff_agree = np.mean(np.array(report["earmuff"]) == np.array(reference["earmuff"])) * 100
+        print(f"{report['backend']:<16}{report['load_s']:>8.2f}{report['single_ms']:>12.1f}{report['batched_ms']:>16.1f}"
+              f"{report['peak_rss_mb']:>13.0f}{mask_agree:>11.1f}%{earmuff_agree:>14.1f}%")
+
+
+if __name__ == "__main__":
+    main()
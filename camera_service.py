@@ -0,0 +1,114 @@
+import queue
+import threading
+
+from frame_grabber import FrameGrabber
+from motion_gate import MotionGate
+from ppe_inference import crop_people
+
+
+# Parse a comma-separated list of camera sources (device indices, RTSP URLs or video files)
+def parse_sources(spec):
+    sources = []
+    for item in spec.split(","):
+        item = item.strip()
+        if item:
+            sources.append(int(item) if item.isdigit() else item)
+    return sources
+
+
+class CameraStream:
+    """One camera: its capture worker plus the detection state kept for it."""
+
+    def __init__(self, camera_id, source, size=(416, 416), pause_when_idle=False):
+        self.camera_id = camera_id
+        self.source = source
+        self.grabber = FrameGrabber(source, size=size, pause_when_idle=pause_when_idle)
+
+        # Motion-gated HOG person detector per stream so stream workers never share detector state.
+        # Only the stream's detection thread touches it; other threads ask for a reset via gate_reset.
+        self.person_gate = MotionGate()
+        self.gate_reset = threading.Event()
+
+    def start(self):
+        self.grabber.start()
+        return self
+
+    def stop(self):
+        self.grabber.stop()
+
+    # Freshest frame for this camera, or None if nothing has been captured yet
+    def latest_frame(self):
+        return self.grabber.latest()[1]
+
+
+class InferencePool:
+    """Shared PPE inference workers that batch detected people across camera streams.
+
+    Stream workers submit a frame and its person boxes without blocking; each
+    inference worker drains whatever is queued (up to max_batch frames), crops
+    every person out of every frame and classifies all crops in one engine call.
+    Results are handed to on_result(stream, frame, people), where people is a
+    list of (box, mask_result, earmuff_result) tuples, one per detected person.
+    """
+
+    def __init__(self, engine, on_result, max_batch=16, workers=1, queue_size=32):
+        self.engine = engine
+        self.on_result = on_result
+        self.max_batch = max_batch
+        self.jobs = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self._threads = [
+            threading.Thread(target=self._run, name=f"inference-{i}", daemon=True) for i in range(workers)
+        ]
+
+    def start(self):
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    # Queue a frame and its person boxes for classification; returns False (and drops it) if the pool is saturated
+    def submit(self, stream, frame, boxes, check_mask, check_earmuff):
+        try:
+            self.jobs.put_nowait((stream, frame, boxes, check_mask, check_earmuff))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _next_batch(self):
+        jobs = [self.jobs.get()]
+        while len(jobs) < self.max_batch:
+            try:
+                jobs.append(self.jobs.get_nowait())
+            except queue.Empty:
+                break
+        return jobs
+
+    def _run(self):
+        while True:
+            jobs = self._next_batch()
+            check_mask = any(job[3] for job in jobs)
+            check_earmuff = any(job[4] for job in jobs)
+
+            # Flatten every person crop from every frame into one batch
+            crops = []
+            for _, frame, boxes, _, _ in jobs:
+                crops.extend(crop_people(frame, boxes))
+            try:
+                mask_labels, earmuff_labels = self.engine.predict_frames(crops, mask=check_mask, earmuff=check_earmuff)
+            except Exception as e:
+                print(f"Inference error on batch of {len(crops)} people from {len(jobs)} frames: {e}")
+                continue
+
+            offset = 0
+            for stream, frame, boxes, job_mask, job_earmuff in jobs:
+                people = []
+                for i, box in enumerate(boxes, start=offset):
+                    mask_result = mask_labels[i] if job_mask else "No detection"
+                    earmuff_result = earmuff_labels[i] if job_earmuff else "No detection"
+                    people.append((tuple(int(v) for v in box), mask_result, earmuff_result))
+                offset += len(boxes)
+                try:
+                    self.on_result(stream, frame, people)
+                except Exception as e:
+                    print(f"Error handling result for {stream.camera_id}: {e}")
@@ -0,0 +1,54 @@
+import numpy as np
+
+from motion_gate import HOG_WINDOW, MotionGate
+
+FRAME_SIZES = ((416, 416), (640, 480), (1280, 720))
+
+
+# Motion boxes (x, y, w, h) across the whole frame, edges and corners included
+def motion_regions(frame_w, frame_h):
+    regions = [(380, 88, 36, 224), (frame_w - 4, frame_h - 4, 4, 4), (0, frame_h - 8, 8, 8), (0, 0, 4, 4)]
+    for x in range(0, frame_w, 24):
+        for y in range(0, frame_h, 24):
+            for w, h in ((4, 4), (36, 60), (36, 224)):
+                if x + w <= frame_w and y + h <= frame_h:
+                    regions.append((x, y, w, h))
+    return regions
+
+
+# Every padded ROI must lie inside the frame, cover the motion and fit at least one HOG window;
+# a smaller ROI crashes detectMultiScale (opencv 4.9)
+def check_pad_region():
+    checked = 0
+    for frame_w, frame_h in FRAME_SIZES:
+        for region in motion_regions(frame_w, frame_h):
+            x0, y0, x1, y1 = MotionGate._pad_region(region, frame_w, frame_h)
+            rx, ry, rw, rh = region
+            assert 0 <= x0 and 0 <= y0 and x1 <= frame_w and y1 <= frame_h, (region, (x0, y0, x1, y1))
+            assert x1 - x0 >= HOG_WINDOW[0] and y1 - y0 >= HOG_WINDOW[1], (region, (x0, y0, x1, y1))
+            assert x0 <= rx and y0 <= ry and rx + rw <= x1 and ry + rh <= y1, (region, (x0, y0, x1, y1))
+            checked += 1
+    print(f"{checked} motion regions padded to valid HOG ROIs; "
+          f"edge ROI (380, 88, 36, 224) in 416x416 -> {MotionGate._pad_region((380, 88, 36, 224), 416, 416)}")
+
+
+# End to end: motion in every corner of the frame must run HOG without crashing the process
+def check_corner_motion():
+    for corner in ((slice(356, None), slice(380, None)), (slice(356, None), slice(None, 36)),
+                   (slice(None, 60), slice(380, None)), (slice(None, 60), slice(None, 36))):
+        gate = MotionGate()
+        frame = np.zeros((416, 416, 3), dtype=np.uint8)
+        gate.detect(frame)
+        frame[corner] = 255
+        gate.detect(frame)
+        print(f"Corner motion: {gate.stats_summary()}")
+
+
+def main():
+    check_pad_region()
+    check_corner_motion()
+    print("Motion gate checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import argparse
+import os
+
+import tensorflow as tf
+
+from ppe_inference import EARMUFF_MODEL_FILE, MASK_MODEL_FILE, load_sample_frames, preprocess_frames, tflite_path
+
+
+# Convert one .keras model to a float16 or full-integer int8 TFLite flatbuffer
+def convert_model(keras_path, variant, calibration_frames=None):
+    model = tf.keras.models.load_model(keras_path)
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+
+    if variant == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+    elif variant == "int8":
+        if not calibration_frames:
+            raise ValueError("int8 conversion needs calibration frames (--calibration-dir)")
+
+        def representative_dataset():
+            for frame in calibration_frames:
+                yield [preprocess_frames([frame])]
+
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.int8
+        converter.inference_output_type = tf.int8
+    else:
+        raise ValueError(f"Unknown variant: {variant}")
+
+    output_path = tflite_path(keras_path, variant)
+    with open(output_path, "wb") as f:
+        f.write(converter.convert())
+    print(f"Converted {keras_path} -> {output_path} ({os.path.getsize(output_path) / 1024:.0f} KB)")
+    return output_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert the PPE Keras models to TFLite for edge inference.")
+    parser.add_argument("--variant", choices=["int8", "float16"], default="int8")
+    parser.add_argument("--calibration-dir", help="folder of sample frames for int8 calibration")
+    parser.add_argument("--calibration-limit", type=int, default=200)
+    parser.add_argument("--models", nargs="+", default=[MASK_MODEL_FILE, EARMUFF_MODEL_FILE])
+    args = parser.parse_args()
+
+    calibration_frames = None
+    if args.calibration_dir:
+        calibration_frames = load_sample_frames(args.calibration_dir, args.calibration_limit)
+        print(f"Loaded {len(calibration_frames)} calibration frames from {args.calibration_dir}")
+
+    for keras_path in args.models:
+        convert_model(keras_path, args.variant, calibration_frames)
+
+
+if __name__ == "__main__":
+    main()
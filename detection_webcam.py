@@ -4,12 +4,16 @@ import paho.mqtt.client as mqtt
 import threading
 import base64
 import json
-import numpy as np
-from tensorflow.keras.models import load_model
 import csv
+import os
 from datetime import datetime
-import matplotlib.pyplot as plt
-import pandas as pd
+from alert_dispatcher import AlertDispatcher
+from camera_service import CameraStream, InferencePool, parse_sources
+from graph_renderer import GraphRenderer, ScatterChart
+from image_envelope import pack_image
+from ppe_inference import load_ppe_engine
+from violation_index import ViolationIndex
+from violation_store import ViolationStore
 
 # MQTT Broker details
 MQTT_BROKER = "localhost"
@@ -23,109 +27,134 @@ PICTURE_TOPIC = "sensor/picture"
 GET_GRAPH_TOPIC = "topic/getGraph/camera"
 NOISE_ALERT_TOPIC = "sensor/NoiseAlertMessage"
 
-# Alert interval settings
+# Image topics are sent as binary envelopes (metadata header + raw JPEG); "base64" restores the legacy text/JSON format
+IMAGE_TRANSPORT = os.environ.get("IMAGE_TRANSPORT", "binary")
+
+# Alert interval settings (throttled per camera and alert topic by the alert dispatcher)
 latest_pm_reading = 0
-last_pm_alert_time = 0
-last_noise_alert_time = 0
 ALERT_INTERVAL = 15  # seconds
 
-# Camera setup
-camera = cv2.VideoCapture(0)
+# Camera setup: comma-separated device indices, RTSP URLs or video files, e.g. "0,rtsp://cam2/stream"
+CAMERA_SOURCES = parse_sources(os.environ.get("CAMERA_SOURCES", "0"))
+INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", "1"))
+
+# Detection rate per camera while armed; cameras stop capturing while detection is disarmed
+DETECTION_FPS = float(os.environ.get("DETECTION_FPS", "1"))
+PAUSE_CAMERAS_WHEN_IDLE = os.environ.get("PAUSE_CAMERAS_WHEN_IDLE", "1") == "1"
+GATE_STATS_INTERVAL = 100  # frames between person-gate stage counter printouts
 
-# Detection flags
+# One capture worker per stream; each keeps the latest frames in its own ring buffer
+cameras = {}
+for index, source in enumerate(CAMERA_SOURCES):
+    cameras[f"cam{index}"] = CameraStream(
+        f"cam{index}", source, size=(416, 416), pause_when_idle=PAUSE_CAMERAS_WHEN_IDLE
+    ).start()
+DEFAULT_CAMERA_ID = next(iter(cameras))
+
+# Detection flags, armed and disarmed by sensor status messages through this condition
 detect_mask = False
 detect_headphones = False
+detection_armed = threading.Condition()
 
-# Load models
-mask_model = load_model("mask_detector.keras")
-earmuff_model = load_model("earmuff_detector.keras")
-
-# Load OpenCV HOG person detector
-hog = cv2.HOGDescriptor()
-hog.setSVMDetector(cv2.HOGDescriptor_getDefaultPeopleDetector())
+# Load models: converted TFLite artifacts when available ("auto"), otherwise the Keras originals
+PPE_BACKEND = os.environ.get("PPE_BACKEND", "auto")  # auto, tflite or keras
+PPE_TFLITE_VARIANT = os.environ.get("PPE_TFLITE_VARIANT", "int8")  # int8 or float16
+PPE_THREADS = int(os.environ.get("PPE_THREADS", "2"))
+ppe_engine = load_ppe_engine(PPE_BACKEND, variant=PPE_TFLITE_VARIANT, num_threads=PPE_THREADS)
 
 # CSV file to store violations
 CSV_FILE = "violations.csv"
 
+CSV_HEADERS = ["timestamp", "violation_type", "camera_id"]
+
 # Check if the file exists and write headers if it's a new file
 def initialize_csv():
     try:
         with open(CSV_FILE, mode='r', newline='') as file:
-            pass  # File exists
+            rows = list(csv.reader(file))
     except FileNotFoundError:
         with open(CSV_FILE, mode='w', newline='') as file:
             writer = csv.writer(file)
-            writer.writerow(["timestamp", "violation_type"])  # Headers
+            writer.writerow(CSV_HEADERS)  # Headers
+        return
+
+    # Logs from before multi-camera support have no camera_id column: attribute them to the default camera
+    if rows and "camera_id" not in rows[0]:
+        with open(CSV_FILE, mode='w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(CSV_HEADERS)
+            writer.writerows(row + [DEFAULT_CAMERA_ID] for row in rows[1:])
 
 initialize_csv()
 
+# Violations are buffered in memory and appended to the CSV in batches by a background writer
+violation_store = ViolationStore(CSV_FILE, CSV_HEADERS, batch_size=50, flush_interval=5.0)
+
 # Function to add violation to CSV
-def add_violation(violation_type):
+def add_violation(violation_type, camera_id):
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    with open(CSV_FILE, mode='a', newline='') as file:
-        writer = csv.writer(file)
-        writer.writerow([timestamp, violation_type])
-
-# Helper function to generate and publish the violation graph
-def generate_violation_graph():
-   # Read the CSV into a pandas DataFrame
-    df = pd.read_csv(CSV_FILE)
-
-    # Separate the data based on violation type
-    no_mask_df = df[df['violation_type'] == 'no_mask']
-    no_earmuff_df = df[df['violation_type'] == 'no_earmuff']
-
-    # Convert timestamp to datetime format for easier manipulation
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
-    no_mask_df['timestamp'] = pd.to_datetime(no_mask_df['timestamp'])
-    no_earmuff_df['timestamp'] = pd.to_datetime(no_earmuff_df['timestamp'])
-
-    # Extract date and time from the timestamp
-    no_mask_df['date'] = no_mask_df['timestamp'].dt.date
-    no_mask_df['time'] = no_mask_df['timestamp'].dt.hour + no_mask_df['timestamp'].dt.minute / 60.0
-
-    no_earmuff_df['date'] = no_earmuff_df['timestamp'].dt.date
-    no_earmuff_df['time'] = no_earmuff_df['timestamp'].dt.hour + no_earmuff_df['timestamp'].dt.minute / 60.0
-
-    # Create a plot
-    plt.figure(figsize=(12, 6))
-   # Plot no mask violations (with exact time on x-axis and date on y-axis)
-    plt.scatter(no_mask_df['time'], no_mask_df['date'], c='r', label="No Mask Violations")
-
-    # Plot no earmuff violations (with exact time on x-axis and date on y-axis)
-    plt.scatter(no_earmuff_df['time'], no_earmuff_df['date'], c='b', label="No Earmuff Violations")
-
-    # Set labels and title
-    plt.xlabel("Time (Hours of the Day)")
-    plt.ylabel("Date")
-    plt.title("Violations Graph (No Mask and No Earmuff)")
-
-    # Rotate the x-axis labels for better readability
-    plt.xticks(rotation=45)
-    
-    # Set the y-axis to represent hours of the day (0-23)
-    #plt.yticks(range(24))
-
-    # Add legend
-    plt.legend()
-
-    plt.tight_layout()
-
-    # Save the plot to a file
-    graph_path = "/tmp/violation_graph.png"
-    plt.savefig(graph_path)
-    plt.close()
-
-    # Publish the graph image as base64 to MQTT
-    with open(graph_path, "rb") as img_file:
-        image_data = img_file.read()
-        client.publish("sensor/violation_graph", image_data)
-        print("Published violation graph to topic: sensor/violation_graph")
-
+    violation_store.add([timestamp, violation_type, camera_id])
+    violation_index.add(timestamp, violation_type)
+
+# Violation counts -> graph series: one marker per (date, hour, type), sized by count
+def violation_series(counts):
+    series = {"no_mask": ([], [], []), "no_earmuff": ([], [], [])}
+    for (day, hour, violation_type), count in counts.items():
+        if violation_type in series:
+            hours, dates, sizes = series[violation_type]
+            hours.append(hour + 0.5)  # Centre of the hour bucket
+            dates.append(datetime.strptime(day, "%Y-%m-%d").date())
+            sizes.append(20 + 10 * count)
+    return series
+
+# The violation graph (hour of day on x-axis, date on y-axis, marker size = number of violations);
+# built once on the render worker and then only updated with new data
+def violation_chart():
+    return ScatterChart("Violations Graph (No Mask and No Earmuff)", "Time (Hours of the Day)", "Date",
+                        {"no_mask": ("No Mask Violations", 'r'), "no_earmuff": ("No Earmuff Violations", 'b')},
+                        figsize=(12, 6), xlim=(0, 24), xticks=range(0, 25, 2))
+
+# Current violation series, versioned by the index so an unchanged graph is not rendered again
+def violation_graph_data():
+    version, counts = violation_index.snapshot()
+    return version, violation_series(counts)
+
+# Publish the graph image to MQTT
+def publish_violation_graph(image_data):
+    client.publish("sensor/violation_graph", image_data)
+    print("Published violation graph to topic: sensor/violation_graph")
+
+# Violation counts per (date, hour, type): seeded once from the CSV, then updated as violations are added.
+# Graph requests go to a single render worker that coalesces them and reuses the PNG until new data arrives.
+violation_index = ViolationIndex()
+print(f"Loaded {violation_index.seed_from_csv(CSV_FILE)} past violations into the index")
+graph_renderer = GraphRenderer()
+graph_renderer.add_chart("violations", violation_chart)
+
+
+# Update the detection flags and wake (or idle) the detection workers and cameras
+def set_detection_flags(mask=None, headphones=None):
+    global detect_mask, detect_headphones
+    with detection_armed:
+        was_armed = detect_mask or detect_headphones
+        if mask is not None:
+            detect_mask = mask
+        if headphones is not None:
+            detect_headphones = headphones
+        armed = detect_mask or detect_headphones
+
+        if armed and not was_armed:
+            for stream in cameras.values():
+                stream.gate_reset.set()  # The background model is stale after an idle period
+                stream.grabber.hold()
+        elif was_armed and not armed:
+            for stream in cameras.values():
+                stream.grabber.release()
+        detection_armed.notify_all()
 
 # MQTT callback
 def on_message(client, userdata, message):
-    global detect_mask, detect_headphones, latest_pm_reading
+    global latest_pm_reading
     topic = message.topic
     payload = message.payload.decode("utf-8")
 
@@ -134,7 +163,7 @@ def on_message(client, userdata, message):
             data = json.loads(payload)
             status = data.get("status", "LOW")
             latest_pm_reading = data.get("pm2_5", 0)
-            detect_mask = status == "HIGH"
+            set_detection_flags(mask=status == "HIGH")
             print("PM2.5 status:", "HIGH - Mask detection ON" if detect_mask else "LOW - Mask detection OFF")
         except json.JSONDecodeError:
             print("Error decoding PM_STATUS payload:", payload)
@@ -145,7 +174,7 @@ def on_message(client, userdata, message):
             #print(data)
             status = data.get("status", "LOW")
             latest_db_reading = data.get("db", 0)
-            detect_headphones = status == "HIGH"
+            set_detection_flags(headphones=status == "HIGH")
             #print(detect_headphone)
             if(detect_headphones == True):
                 print("Noise status:", "HIGH - EarMuffs detection ON")
@@ -155,136 +184,136 @@ def on_message(client, userdata, message):
 
     elif topic == GET_PICTURE_TOPIC:
         print("Received request to capture an image.")
-        capture_and_publish_image()
+        # The payload may name a camera ID; anything else (e.g. "getPicture") uses the default camera
+        capture_and_publish_image(payload if payload in cameras else DEFAULT_CAMERA_ID)
 
     elif topic == GET_GRAPH_TOPIC:
         print("Received request for violation graph")
-        threading.Thread(target=generate_violation_graph).start()
-
-# Capture and resize image
-def capture_image():
-    for _ in range(3):
-        ret, frame = camera.read()
-        time.sleep(0.1)
-    if ret:
-        frame_resized = cv2.resize(frame, (416, 416))
-        cv2.imwrite("captured_image.jpg", frame_resized)
-        return "captured_image.jpg", frame_resized
+        graph_renderer.request("violations", violation_graph_data, publish_violation_graph)
+
+# JPEG-encode a frame and publish it in the configured image transport
+def publish_image(topic, image_frame, **meta):
+    _, buffer = cv2.imencode('.jpg', image_frame)
+    if IMAGE_TRANSPORT == "binary":
+        client.publish(topic, pack_image(buffer.tobytes(), **meta))
     else:
-        print("Error capturing image!")
-        return None, None
-
-# Publish image to MQTT
-def capture_and_publish_image():
-    image_path, image_frame = capture_image()
-    if image_frame is not None:
-        _, buffer = cv2.imencode('.jpg', image_frame)
-        encoded_image = base64.b64encode(buffer).decode('utf-8')
-        client.publish(PICTURE_TOPIC, encoded_image)
+        client.publish(topic, base64.b64encode(buffer).decode('utf-8'))
+
+# Publish the freshest frame of a camera (already resized to 416x416, read-only). Never blocks the MQTT
+# thread: a streaming camera answers at once, an idle one is woken and its grabber thread publishes
+# the first fresh frame.
+def capture_and_publish_image(camera_id=DEFAULT_CAMERA_ID):
+    def publish(_, image_frame):
+        if image_frame is None:
+            print(f"Error capturing image from {camera_id}!")
+            return
+        publish_image(PICTURE_TOPIC, image_frame, camera=camera_id)
         print("Published image to topic:", PICTURE_TOPIC)
 
-# Person detection using OpenCV HOG
-def detect_person(image_frame):
-    gray = cv2.cvtColor(image_frame, cv2.COLOR_BGR2GRAY)
-    boxes, _ = hog.detectMultiScale(gray, winStride=(8, 8))
-    return len(boxes) > 0
-
-# Detect mask from full frame
-def detect_mask_local(image_frame, model):
-    image = cv2.resize(image_frame, (224, 224))
-    image = image.astype("float32") / 255.0
-    image = np.expand_dims(image, axis=0)
-
-    prediction = model.predict(image)[0]
-    label = "mask" if np.argmax(prediction) == 0 else "no-mask"
-    return label
-
-# Detect earmuff from full frame
-def detect_earmuff_local(image_frame, model):
-    image = cv2.resize(image_frame, (224, 224))
-    image = image.astype("float32") / 255.0
-    image = np.expand_dims(image, axis=0)
+    cameras[camera_id].grabber.request_snapshot(publish)
 
-    prediction = model.predict(image)[0]
-    label = "with_earmuff" if np.argmax(prediction) == 0 else "without_earmuff"
-    return label
+# Person detection through the stream's motion gate (HOG only runs where the scene changed).
+# Returns the person boxes (x, y, w, h); an empty array means nobody is in frame.
+# Runs on the stream's detection thread, which also applies pending gate resets between frames.
+def detect_person(stream, image_frame):
+    if stream.gate_reset.is_set():
+        stream.gate_reset.clear()
+        stream.person_gate.reset()
+    boxes = stream.person_gate.detect(image_frame)
+    if stream.person_gate.stats["frames"] % GATE_STATS_INTERVAL == 0:
+        print(f"[{stream.camera_id}] Person gate: {stream.person_gate.stats_summary()}")
+    return boxes
 
 # Publish screenshot to MQTT
-def publish_screenshot(image_frame):
-    _, buffer = cv2.imencode('.jpg', image_frame)
-    encoded_image = base64.b64encode(buffer).decode('utf-8')
-    client.publish(REPORT_TOPIC, encoded_image)
+def publish_screenshot(image_frame, camera_id=DEFAULT_CAMERA_ID):
+    publish_image(REPORT_TOPIC, image_frame, camera=camera_id)
     print("Published screenshot to topic:", REPORT_TOPIC)
 
-# Publish PM alert to MQTT
-def prepare_and_publish_pm_alert(image_frame):
-    global last_pm_alert_time
-    current_time = time.time()
-    if current_time - last_pm_alert_time >= ALERT_INTERVAL:
-        _, buffer = cv2.imencode('.jpg', image_frame)
-        encoded_image = base64.b64encode(buffer).decode('utf-8')
-        alert_payload = {
-            "message": "No mask detected while PM2.5 is high!",
-            "pm_reading": latest_pm_reading,
-            "image": encoded_image
-        }
-        client.publish(PM_ALERT_TOPIC, json.dumps(alert_payload))
-        print("PM alert sent to:", PM_ALERT_TOPIC)
-        last_pm_alert_time = current_time
-    else:
-        print("PM alert throttled to avoid spamming.")
-        
-def prepare_and_publish_noise_alert(image_frame):
-    global last_noise_alert_time
-    current_time = time.time()
-    if current_time - last_noise_alert_time >= ALERT_INTERVAL:
-        _, buffer = cv2.imencode('.jpg', image_frame)
-        encoded_image = base64.b64encode(buffer).decode('utf-8')
-        alert_payload = {
-            "message": "No earmuff detected while noise level is high!",
-            "image": encoded_image
-        }
-        client.publish(NOISE_ALERT_TOPIC, json.dumps(alert_payload))
-        print("Noise alert sent to:", NOISE_ALERT_TOPIC)
-        last_noise_alert_time = current_time
-    else:
-        print("Noise alert throttled to avoid spamming.")
-
-# Main detection loop
-def detection_loop():
+# Build the PM alert for a frame (throttling, encoding and publishing happen in the alert dispatcher)
+def prepare_pm_alert(stream, violators):
+    alert_payload = {
+        "message": f"No mask detected on {len(violators)} person(s) while PM2.5 is high!",
+        "pm_reading": latest_pm_reading,
+        "camera": stream.camera_id,
+        "people": len(violators)
+    }
+    return PM_ALERT_TOPIC, alert_payload, violators
+
+# Build the noise alert for a frame
+def prepare_noise_alert(stream, violators):
+    alert_payload = {
+        "message": f"No earmuff detected on {len(violators)} person(s) while noise level is high!",
+        "camera": stream.camera_id,
+        "people": len(violators)
+    }
+    return NOISE_ALERT_TOPIC, alert_payload, violators
+
+# Record per-person violations and raise alerts for one classified frame (runs on an inference worker)
+def handle_detection_result(stream, image_frame, people):
+    no_mask, no_earmuff = [], []
+    for box, mask_result, headphone_result in people:
+        print(f"[{stream.camera_id}] Person at {box}: Mask Result: {mask_result}, Headphone Result: {headphone_result}")
+
+        # Mark violations if any, one record per person
+        if mask_result == "no-mask":
+            add_violation("no_mask", stream.camera_id)
+            no_mask.append(box)
+        if headphone_result == "without_earmuff":
+            add_violation("no_earmuff", stream.camera_id)
+            no_earmuff.append(box)
+
+    # PM and noise alerts for the same frame share one encode in the dispatcher
+    alerts = []
+    if no_mask:
+        alerts.append(prepare_pm_alert(stream, no_mask))
+    if no_earmuff:
+        alerts.append(prepare_noise_alert(stream, no_earmuff))
+    if alerts:
+        alert_dispatcher.submit(stream.camera_id, image_frame, alerts)
+
+# Shared inference pool that batches frames from every stream into one engine call
+inference_pool = InferencePool(ppe_engine, handle_detection_result, max_batch=len(cameras), workers=INFERENCE_WORKERS)
+
+# Armed when PM2.5 or noise is HIGH
+def detection_is_armed():
+    return detect_mask or detect_headphones
+
+# Per-stream detection loop: idles on the condition until armed, then runs at DETECTION_FPS.
+# Person detection runs in parallel per camera, PPE checks go to the shared pool.
+def detection_loop(stream):
+    interval = 1.0 / DETECTION_FPS
+    last_timestamp = 0.0
     while True:
-        if detect_mask or detect_headphones:
-            image_path, image_frame = capture_image()
-            print("Captured frame.")
-
-            if not detect_person(image_frame):
-                print("No person detected → skipping PPE checks")
-                continue
-
-            mask_result = detect_mask_local(image_frame, mask_model) if detect_mask else "No detection"
-            headphone_result = detect_earmuff_local(image_frame, earmuff_model) if detect_headphones else "No detection"
-
-            print("Mask Result:", mask_result)
-            print("Headphone Result:", headphone_result)
-
-            # Mark violations if any
-            if mask_result == "no-mask":
-                add_violation("no_mask")
-            if headphone_result == "without_earmuff":
-                add_violation("no_earmuff")
-
-            if detect_mask and mask_result == "no-mask":
-                prepare_and_publish_pm_alert(image_frame)
-            print(headphone_result)
-            if headphone_result == "without_earmuff":
-                prepare_and_publish_noise_alert(image_frame)    
-        
-        time.sleep(1)
+        with detection_armed:
+            detection_armed.wait_for(detection_is_armed)
+            check_mask, check_earmuff = detect_mask, detect_headphones
+        started = time.monotonic()
+
+        # Only process frames we have not seen yet
+        timestamp, image_frame = stream.grabber.wait_for_frame(after=last_timestamp, timeout=interval)
+        if image_frame is not None and timestamp > last_timestamp:
+            last_timestamp = timestamp
+            try:
+                boxes = detect_person(stream, image_frame)
+                if len(boxes):
+                    inference_pool.submit(stream, image_frame, boxes, check_mask, check_earmuff)
+                else:
+                    print(f"[{stream.camera_id}] No person detected → skipping PPE checks")
+            except Exception as e:
+                # One bad frame must not stop this camera's detection for the rest of the run
+                print(f"[{stream.camera_id}] Detection error: {e}")
+
+        # Sleep off the rest of the frame budget, waking early if detection is disarmed
+        remaining = interval - (time.monotonic() - started)
+        if remaining > 0:
+            with detection_armed:
+                detection_armed.wait_for(lambda: not detection_is_armed(), timeout=remaining)
 
 # MQTT setup
 client = mqtt.Client()
 client.on_message = on_message
 client.connect(MQTT_BROKER, MQTT_PORT, 60)
+alert_dispatcher = AlertDispatcher(client, ALERT_INTERVAL, binary=IMAGE_TRANSPORT == "binary")
 client.subscribe([
     (PM_STATUS_TOPIC, 0),
     (NOISE_STATUS_TOPIC, 0),
@@ -292,8 +321,12 @@ client.subscribe([
     (GET_GRAPH_TOPIC,0)
 ])
 
-print("MQTT client initialized. Waiting for sensor events...")
+print(f"MQTT client initialized with {len(cameras)} camera(s). Waiting for sensor events...")
 
-# Start detection loop in a separate thread
-threading.Thread(target=detection_loop, daemon=True).start()
+# Start the graph worker, the alert dispatcher, the inference pool and one detection worker per camera
+graph_renderer.start()
+alert_dispatcher.start()
+inference_pool.start()
+for stream in cameras.values():
+    threading.Thread(target=detection_loop, args=(stream,), name=f"detect-{stream.camera_id}", daemon=True).start()
 client.loop_forever()
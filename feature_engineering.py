@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+# Create lag features from `window` consecutive rows to predict the target `horizon` rows later.
+# Row i of X is rows i .. i+window-1 flattened row by row; its target is row i+window+horizon.
+# `target_cols` is required: one column name (y is a Series) or a list of names (y is a DataFrame).
+# Windows are taken as a strided view of the underlying array, so the only copy made is the
+# final (n, window * columns) feature matrix.
+def create_lag_features(df, target_cols, window=3, horizon=5):
+    values = df.to_numpy()
+    n_samples = max(len(df) - window - horizon, 0)
+    single_target = isinstance(target_cols, str)
+    targets = [target_cols] if single_target else list(target_cols)
+    target_idx = [df.columns.get_loc(col) for col in targets]
+
+    if n_samples == 0:
+        X = pd.DataFrame()
+        y = pd.Series(dtype=values.dtype) if single_target else pd.DataFrame(columns=targets)
+        return X, y
+
+    windows = sliding_window_view(values, (window, values.shape[1]))[:n_samples, 0]
+    X = pd.DataFrame(windows.reshape(n_samples, window * values.shape[1]))
+
+    target_values = values[window + horizon:window + horizon + n_samples][:, target_idx]
+    if single_target:
+        return X, pd.Series(target_values[:, 0])
+    return X, pd.DataFrame(target_values, columns=targets)
+
+
+# Direct multi-horizon samples: row i of X is rows i .. i+window-1 flattened row by row, and row i
+# of Y holds `target_col` at each of `horizons` rows after the window's last row (1 = the next row).
+# Every horizon comes from the same window, so a multi-output model predicts the whole trajectory at once.
+def create_horizon_features(df, window=10, horizons=range(1, 121), target_col='LZeq'):
+    values = df.to_numpy(dtype=np.float64)
+    horizons = np.asarray(horizons)
+    n_samples = max(len(df) - window + 1 - int(horizons.max()), 0)
+    if n_samples == 0:
+        return pd.DataFrame(), pd.DataFrame(columns=horizons)
+
+    windows = sliding_window_view(values, (window, values.shape[1]))[:n_samples, 0]
+    X = pd.DataFrame(windows.reshape(n_samples, window * values.shape[1]))
+
+    target = values[:, df.columns.get_loc(target_col)]
+    last_rows = np.arange(window - 1, window - 1 + n_samples)
+    Y = pd.DataFrame(target[last_rows[:, None] + horizons[None, :]], columns=horizons)
+    return X, Y
@@ -0,0 +1,154 @@
+import threading
+import time
+from collections import deque
+
+import cv2
+
+
+class FrameGrabber:
+    """Continuously drains a cv2.VideoCapture into a small ring buffer.
+
+    The capture device is only ever touched by the grabber thread. Readers get
+    the freshest (timestamp, frame) pair without waiting on the camera and
+    without a copy, so frames handed out must be treated as read-only.
+
+    With pause_when_idle, the grabber only reads from the device while at least
+    one consumer holds it (see hold/release), so an idle node does no capture work.
+    request_snapshot() serves one-off requests without blocking the caller: an
+    idle device is woken and the grabber thread delivers the first fresh frame.
+    """
+
+    # Frames the driver may still have queued from before a pause
+    STALE_FRAMES = 3
+
+    def __init__(self, source=0, size=(416, 416), buffer_size=4, pause_when_idle=False):
+        self.source = source
+        self.size = size
+        self.pause_when_idle = pause_when_idle
+        self.frames = deque(maxlen=buffer_size)
+        self.frame_count = 0
+        self._lock = threading.Lock()
+        self._new_frame = threading.Condition(self._lock)
+        self._active = threading.Event()
+        self._holders = 0
+        self._skip = 0
+        self._snapshots = []  # (requested, deadline, callback) waiting for a fresh frame
+        if not pause_when_idle:
+            self._active.set()
+        self._running = False
+        self._thread = None
+        self._capture = None
+
+    def start(self):
+        if self._running:
+            return self
+        self._capture = cv2.VideoCapture(self.source)
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=f"grabber-{self.source}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        self._active.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+        if self._capture is not None:
+            self._capture.release()
+
+    # Keep the device streaming on behalf of a consumer. Waking an idle grabber drops the frames
+    # captured before the pause, so nobody is handed a picture as old as the idle period.
+    def hold(self):
+        with self._lock:
+            self._holders += 1
+            if not self._active.is_set():
+                self.frames.clear()
+                self._skip = self.STALE_FRAMES
+                self._active.set()
+
+    # Drop a hold; the grabber goes idle once nobody holds it (if pause_when_idle)
+    def release(self):
+        with self._lock:
+            self._holders = max(0, self._holders - 1)
+            if self._holders == 0 and self.pause_when_idle:
+                self._active.clear()
+
+    def _run(self):
+        while self._running:
+            self._expire_snapshots()
+            if not self._active.wait(timeout=0.5):
+                continue
+            ret, frame = self._capture.read()
+            if not ret:
+                # Device hiccup or end of a test video: back off briefly instead of spinning
+                time.sleep(0.05)
+                continue
+            if self._skip:
+                self._skip -= 1
+                continue
+            if self.size is not None:
+                frame = cv2.resize(frame, self.size)
+            with self._new_frame:
+                entry = (time.time(), frame)
+                self.frames.append(entry)
+                self.frame_count += 1
+                self._new_frame.notify_all()
+                due = [request for request in self._snapshots if request[0] < entry[0]]
+                self._snapshots = [request for request in self._snapshots if request[0] >= entry[0]]
+            for _, _, callback in due:
+                self.release()
+                self._deliver(callback, *entry)
+
+    @staticmethod
+    def _deliver(callback, timestamp, frame):
+        try:
+            callback(timestamp, frame)
+        except Exception as e:
+            print(f"Error in snapshot callback: {e}")
+
+    # Requests whose deadline passed get (None, None) so a dead device cannot hold the grabber forever
+    def _expire_snapshots(self):
+        now = time.time()
+        with self._lock:
+            expired = [request for request in self._snapshots if request[1] <= now]
+            self._snapshots = [request for request in self._snapshots if request[1] > now]
+        for _, _, callback in expired:
+            self.release()
+            self._deliver(callback, None, None)
+
+    # Freshest (timestamp, frame) pair, or (None, None) if nothing has been captured yet
+    def latest(self):
+        with self._lock:
+            if not self.frames:
+                return None, None
+            return self.frames[-1]
+
+    # Non-blocking one-off request: callback(timestamp, frame) runs right away if the device is
+    # streaming, otherwise on the grabber thread with the first fresh frame ((None, None) after timeout)
+    def request_snapshot(self, callback, timeout=2.0):
+        if self._active.is_set() and self.frames:
+            self._deliver(callback, *self.latest())
+            return
+        requested = time.time()
+        self.hold()  # before queueing, so delivery can never release a hold that was not taken yet
+        with self._lock:
+            self._snapshots.append((requested, requested + timeout, callback))
+
+    # One fresh frame for a one-off request, waking an idle grabber if needed (blocks up to `timeout`)
+    def snapshot(self, timeout=2.0):
+        if self._active.is_set() and self.frames:
+            return self.latest()
+        requested = time.time()
+        self.hold()
+        try:
+            return self.wait_for_frame(after=requested, timeout=timeout)
+        finally:
+            self.release()
+
+    # Block until a frame newer than `after` is available (used at start-up and by frame-paced consumers)
+    def wait_for_frame(self, after=0.0, timeout=None):
+        with self._new_frame:
+            self._new_frame.wait_for(lambda: self.frames and self.frames[-1][0] > after, timeout=timeout)
+            if not self.frames:
+                return None, None
+            return self.frames[-1]
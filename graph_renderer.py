@@ -0,0 +1,165 @@
+import io
+import threading
+import time
+
+
+# Epoch-ms / datetime x values -> matplotlib date numbers
+def _date_numbers(values):
+    from matplotlib.dates import date2num
+    import numpy as np
+
+    values = list(values)
+    if values and isinstance(values[0], (int, float)):
+        return np.asarray(values, dtype=np.float64) / 86_400_000 + date2num(np.datetime64("1970-01-01"))
+    return date2num(values)
+
+
+def _new_figure(figsize):
+    # Figure + Agg canvas directly: no pyplot state, no GUI backend, safe off the main thread
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    figure = Figure(figsize=figsize)
+    FigureCanvasAgg(figure)
+    return figure
+
+
+class LineChart:
+    """Time series line plot kept alive between renders; update() only swaps the data."""
+
+    def __init__(self, title, ylabel, label=None, xlabel="Time", figsize=(10, 5), marker=None, color=None, tz=None):
+        self.figure = _new_figure(figsize)
+        self.axes = self.figure.add_subplot()
+        self.line, = self.axes.plot([], [], marker=marker, linestyle='-', color=color, label=label)
+        self.axes.xaxis_date(tz)
+        self.axes.set_title(title)
+        self.axes.set_xlabel(xlabel)
+        self.axes.set_ylabel(ylabel)
+        self.axes.grid(True)
+        if label:
+            self.axes.legend()
+        self.axes.tick_params(axis='x', labelrotation=45)
+        self.figure.subplots_adjust(left=0.08, right=0.97, top=0.92, bottom=0.25)
+
+    # x: datetimes or epoch milliseconds, y: values
+    def update(self, data):
+        x, y = data
+        self.line.set_data(_date_numbers(x), list(y))
+        self.axes.relim()
+        self.axes.autoscale_view()
+
+
+class ScatterChart:
+    """Scatter plot with one persistent marker collection per series (x, y dates, marker sizes)."""
+
+    def __init__(self, title, xlabel, ylabel, series, figsize=(12, 6), xlim=None, xticks=None):
+        from matplotlib.dates import DateFormatter
+        from matplotlib.ticker import MaxNLocator
+
+        self.figure = _new_figure(figsize)
+        self.axes = self.figure.add_subplot()
+        self.collections = {
+            name: self.axes.scatter([], [], s=40, c=color, alpha=0.6, label=label)  # s only sizes the legend marker
+            for name, (label, color) in series.items()
+        }
+        # One tick per whole day (integer date numbers are midnights)
+        self.axes.yaxis.set_major_locator(MaxNLocator(integer=True))
+        self.axes.yaxis.set_major_formatter(DateFormatter("%Y-%m-%d"))
+        self.axes.set_title(title)
+        self.axes.set_xlabel(xlabel)
+        self.axes.set_ylabel(ylabel)
+        if xlim is not None:
+            self.axes.set_xlim(*xlim)
+        if xticks is not None:
+            self.axes.set_xticks(xticks)
+        self.axes.tick_params(axis='x', labelrotation=45)
+        self.axes.legend()
+        self.figure.subplots_adjust(left=0.12, right=0.97, top=0.92, bottom=0.15)
+
+    # data: {series name: (x values, y dates, marker sizes)}
+    def update(self, data):
+        import numpy as np
+
+        all_y = []
+        for name, collection in self.collections.items():
+            x, y, sizes = data.get(name, ([], [], []))
+            y = _date_numbers(y) if len(y) else np.empty(0)
+            collection.set_offsets(np.column_stack([x, y]) if len(x) else np.empty((0, 2)))
+            collection.set_sizes(sizes)
+            all_y.extend(y)
+        if all_y:
+            self.axes.set_ylim(min(all_y) - 0.5, max(all_y) + 0.5)
+
+
+class GraphRenderer:
+    """One render worker per process for all of its graphs.
+
+    Charts are registered by name with a factory and built on first use, on the
+    worker thread, so matplotlib is only imported once a graph is requested.
+    Figures then live for the whole process and each render only updates their
+    data and writes a PNG into memory. request(name, source, publish) never
+    blocks: the newest request per chart replaces any that is still waiting, so
+    a burst of requests costs one render and one publish. source() returns
+    (version, data); if the version equals the last rendered one (and is not
+    None) the cached PNG is published again without rendering.
+    """
+
+    def __init__(self, name="graph-renderer"):
+        self.factories = {}
+        self.charts = {}
+        self.cache = {}
+        self.stats = {"requests": 0, "renders": 0, "cache_hits": 0, "coalesced": 0, "errors": 0}
+        self.last_render_ms = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def add_chart(self, name, factory):
+        self.factories[name] = factory
+
+    def request(self, name, source, publish):
+        with self._lock:
+            self.stats["requests"] += 1
+            if name in self._pending:
+                self.stats["coalesced"] += 1
+            self._pending[name] = (source, publish)
+        self._wakeup.set()
+
+    # Render (or take from cache) one chart now, on the calling thread; returns PNG bytes
+    def render(self, name, source):
+        version, data = source()
+        cached = self.cache.get(name)
+        if version is not None and cached is not None and cached[0] == version:
+            self.stats["cache_hits"] += 1
+            return cached[1]
+
+        start = time.perf_counter()
+        chart = self.charts.get(name)
+        if chart is None:
+            chart = self.charts[name] = self.factories[name]()
+        chart.update(data)
+        buffer = io.BytesIO()
+        chart.figure.savefig(buffer, format="png")
+        png = buffer.getvalue()
+        self.cache[name] = (version, png)
+        self.stats["renders"] += 1
+        self.last_render_ms[name] = (time.perf_counter() - start) * 1000
+        return png
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                self._wakeup.clear()
+            for name, (source, publish) in pending.items():
+                try:
+                    publish(self.render(name, source))
+                except Exception as e:
+                    self.stats["errors"] += 1
+                    print(f"Error rendering graph {name}: {e}")
@@ -0,0 +1,43 @@
+import base64
+import json
+import struct
+
+# Binary envelope for image-bearing MQTT topics:
+#   magic (4 bytes) | version (1 byte) | header length (uint16, big-endian) | JSON header | raw JPEG bytes
+# The header carries small metadata such as the alert message, sensor reading and camera ID.
+MAGIC = b"SEMI"
+VERSION = 1
+_PREFIX = struct.Struct(">4sBH")
+
+
+# Wrap raw JPEG bytes and metadata into a binary envelope
+def pack_image(jpeg_bytes, **meta):
+    header = json.dumps(meta, separators=(",", ":")).encode("utf-8")
+    return _PREFIX.pack(MAGIC, VERSION, len(header)) + header + bytes(jpeg_bytes)
+
+
+def is_envelope(payload):
+    return payload[:len(MAGIC)] == MAGIC
+
+
+# Split a binary envelope into (metadata dict, JPEG bytes)
+def unpack_image(payload):
+    if len(payload) < _PREFIX.size or not is_envelope(payload):
+        raise ValueError("Not an image envelope")
+    _, version, header_len = _PREFIX.unpack_from(payload)
+    if version != VERSION:
+        raise ValueError(f"Unsupported image envelope version: {version}")
+    header_end = _PREFIX.size + header_len
+    meta = json.loads(payload[_PREFIX.size:header_end].decode("utf-8"))
+    return meta, payload[header_end:]
+
+
+# Decode any image payload into (metadata dict, JPEG bytes), accepting the binary envelope
+# as well as the legacy formats: a JSON object with a base64 "image" field, or bare base64 text.
+def decode_image_payload(payload):
+    if is_envelope(payload):
+        return unpack_image(payload)
+    if payload[:1] == b"{":
+        meta = json.loads(payload.decode("utf-8"))
+        return meta, base64.b64decode(meta.pop("image"))
+    return {}, base64.b64decode(payload)
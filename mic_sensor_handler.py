@@ -3,9 +3,10 @@ import time
 import json
 import csv
 import paho.mqtt.client as mqtt
-import pandas as pd
-import matplotlib.pyplot as plt
 from datetime import datetime
+from audio_log import AudioLogReader
+from audio_rollup import ROLLUP_FILE, AudioRollup
+from graph_renderer import GraphRenderer, LineChart
 
 # MQTT Konfiguration
 MQTT_BROKER = "172.20.10.2"
@@ -13,43 +14,46 @@ MQTT_PORT = 1883
 SOUND_LEVEL_TOPIC = "topic/getSound"
 GRAPH_TOPIC = "topic/getGraph/sound"
 
-# CSV Datei
-CSV_FILE = "audio_logs/audio_log.csv"
-GRAPH_FILE = "audio_logs/audio_plot.png"
+# Log-Segmente (siehe audio_log.py)
+LOG_FOLDER = "audio_logs"
 
+# Liest nur das Ende des neuesten Segments statt der ganzen CSV (O(1), unabhängig von der Loggröße)
+log_reader = AudioLogReader(LOG_FOLDER)
+
+# Verdichtete Pegel (1 s / 1 min / 1 h, geschrieben von mic_store_new.py) für den Graphen
+rollup = AudioRollup(os.path.join(LOG_FOLDER, ROLLUP_FILE))
+GRAPH_HOURS = float(os.environ.get("SOUND_GRAPH_HOURS", "24"))
 
 
 def get_latest_sound_level():
     print("sound requesting via mqtt")
     try:
-        df = pd.read_csv(CSV_FILE)
-        latest_row = df.iloc[-1]  # Letzte Zeile
-        sound_level = latest_row["Actual SPL (dB)"]
+        latest_row = log_reader.latest()  # Letzte vollständige Zeile
+        if latest_row is None:
+            return {"error": "no readings logged yet"}
+        sound_level = float(latest_row["Actual SPL (dB)"])
         timestamp = latest_row["Timestamp"]
         return {"sound_level": sound_level, "timestamp": timestamp}
     except Exception as e:
         return {"error": str(e)}
 
-def generate_sound_graph():
-    try:
-        df = pd.read_csv(CSV_FILE)
-        df['Timestamp'] = pd.to_datetime(df['Timestamp'])
-        df = df.sort_values(by='Timestamp')
-        
-        plt.figure(figsize=(10, 5))
-        plt.plot(df['Timestamp'], df['Actual SPL (dB)'], label='SPL (dB)', color='b')
-        plt.xlabel('Time')
-        plt.ylabel('Decibel (dB)')
-        plt.title('Sound Level Over Time')
-        plt.xticks(rotation=45)
-        plt.legend()
-        plt.grid()
-        
-        plt.savefig(GRAPH_FILE, bbox_inches='tight')
-        plt.close()
-        return GRAPH_FILE
-    except Exception as e:
-        return None
+# Pegel-Graph: Figur wird einmal im Render-Worker erstellt und danach nur mit neuen Daten aktualisiert
+def sound_chart():
+    return LineChart('Sound Level Over Time', 'Decibel (dB)', label='SPL Leq (dB)', color='b')
+
+# Leq der letzten GRAPH_HOURS Stunden aus der passenden Rollup-Stufe (1 Tag = 1440 Minutenwerte statt
+# ~1,8 Mio. Rohzeilen); Version = neuester Bucket, damit unveränderte Graphen aus dem Cache kommen
+def sound_graph_data():
+    start = time.time() - GRAPH_HOURS * 3600
+    tier = rollup.tier_for(start, time.time())
+    version = rollup.version(tier)  # vor der Abfrage, damit spätere Daten nie unter einer alten Version landen
+    _, df = rollup.query(start, tier=tier)
+    return version, (df['Timestamp'], df['Leq'])
+
+# PNG direkt aus dem Speicher veröffentlichen (keine Datei mehr)
+def publish_sound_graph(image_data):
+    client.publish("sensor/sound_graph", image_data)
+    print(f"Published sound graph to sensor/sound_graph ({graph_renderer.last_render_ms.get('sound', 0):.0f} ms render)")
 
 def on_message(client, userdata, msg):
     topic = msg.topic
@@ -61,12 +65,12 @@ def on_message(client, userdata, msg):
         print("Published latest sound level to sensor/sound_reading")
     
     elif topic == GRAPH_TOPIC:
-        image_path = generate_sound_graph()
-        if image_path:
-            with open(image_path, "rb") as f:
-                image_data = f.read()
-                client.publish("sensor/sound_graph", image_data)
-                print("Published sound graph to sensor/sound_graph")
+        # Ein Render-Worker; Anfragen während eines laufenden Renderns werden zusammengefasst
+        graph_renderer.request("sound", sound_graph_data, publish_sound_graph)
+
+# Graphen werden im Speicher gerendert (matplotlib erst bei der ersten Anfrage geladen)
+graph_renderer = GraphRenderer()
+graph_renderer.add_chart("sound", sound_chart)
 
 # MQTT Client Setup
 client = mqtt.Client()
@@ -76,6 +80,7 @@ client.subscribe(SOUND_LEVEL_TOPIC)
 client.subscribe(GRAPH_TOPIC)
 client.subscribe([(GRAPH_TOPIC, 0), (SOUND_LEVEL_TOPIC, 0)])
 
+graph_renderer.start()
 print("MQTT Listener running.")
 
 client.loop_forever()
@@ -1,11 +1,12 @@
 import numpy as np
-import pandas as pd
 import joblib
+import os
+import threading
 import time
 import paho.mqtt.client as mqtt
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from audio_log import read_levels, read_levels_tail
+from background_trainer import BackgroundTrainer
+from noise_forecaster import NoiseForecaster
 
 # MQTT Config
 MQTT_BROKER = "172.20.10.2"
@@ -13,85 +14,103 @@ MQTT_PORT = 1883
 MQTT_TOPIC_RETRAIN = "audio/retrain"
 MQTT_TOPIC_ALERT = "sensor/SoundAlert"
 
-# CSV file path & model filename
-CSV_FILE = "audio_logs/audio_log.csv"
+# Folder of the 1-minute noise level segments written by mic_store_new.py & model filename
+LOG_FOLDER = "audio_logs"
 MODEL_FILE = "db_model_regression.pkl"
 
-def train_model():
-    """Trains the regression model and saves it."""
-    print("Retraining regression model...")
-    try:
-        data = pd.read_csv(CSV_FILE)
-        required_columns = ['Actual SPL (dB)', 'Rate of Change', 'Timestamp']
-        
-        if not all(col in data.columns for col in required_columns):
-            print("Missing required columns in CSV.")
-            return
+# Minimum test-split R2 a freshly trained model needs before it replaces the live one
+MIN_R2 = float(os.environ.get("NOISE_MODEL_MIN_R2", "0.0"))
+# Seconds to wait after a retrain request so bursts of requests trigger a single fit
+RETRAIN_DEBOUNCE = float(os.environ.get("NOISE_RETRAIN_DEBOUNCE", "2.0"))
+THRESHOLD_DB = 50
+# "incremental": each retrain adds a small forest fitted on the minutes logged since the last one,
+# keeping the newest NOISE_MAX_MEMBERS forests. "full": refit 100 trees on the whole log every time.
+TRAINING_MODE = os.environ.get("NOISE_TRAINING_MODE", "incremental")
+TREES_PER_UPDATE = int(os.environ.get("NOISE_TREES_PER_UPDATE", "20"))
+MAX_MEMBERS = int(os.environ.get("NOISE_MAX_MEMBERS", "8"))
 
-        data['Timestamp'] = pd.to_datetime(data['Timestamp'])
-        data['Minutes'] = (data['Timestamp'] - data['Timestamp'].min()).dt.total_seconds() / 60
-        
-        feature_cols = ['Actual SPL (dB)', 'Rate of Change', 'Minutes']
-        X, y = create_lag_features(data[feature_cols], window=3, horizon=5)
-        
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-        
-        model = RandomForestRegressor(n_estimators=100, random_state=42)
-        model.fit(X_train, y_train)
-        joblib.dump(model, MODEL_FILE)
-        
-        model = joblib.load(MODEL_FILE)
-        print(model)
-        
-        y_pred = model.predict(X_test)
-        print(f"Model evaluation: MAE: {mean_absolute_error(y_test, y_pred):.2f}, MSE: {mean_squared_error(y_test, y_pred):.2f}, R2: {r2_score(y_test, y_pred):.2f}")
-        
-    except Exception as e:
-        print(f"Error during training: {str(e)}")
-    predict_time_to_50dB()
-
-def create_lag_features(df, window=3, horizon=5):
-    X, y = [], []
-    for i in range(len(df) - window - horizon):
-        chunk = df.iloc[i:i + window].values.flatten()
-        X.append(chunk)
-        y.append(df.iloc[i + window + horizon]['Actual SPL (dB)'])
-    return pd.DataFrame(X), pd.Series(y)
-
-def get_last_3_readings():
-    data = pd.read_csv(CSV_FILE)
-    
-    if 'Timestamp' in data.columns:
-        data['Timestamp'] = pd.to_datetime(data['Timestamp'])
-        data['Minutes'] = (data['Timestamp'] - data['Timestamp'].min()).dt.total_seconds() / 60
+def train_model():
+    """Trains or updates the forecaster; returns it only if it validates on the held-out rows."""
+    current = trainer.model
+    if TRAINING_MODE == "incremental" and current is not None:
+        print("Updating regression model with new readings...")
+        data, cursor = read_levels(LOG_FOLDER, after=current.cursor)
+        base = current
     else:
-        print("Error: 'Timestamp' column missing in CSV file.")
-        return []
-    
-    return data[['Actual SPL (dB)', 'Rate of Change', 'Minutes']].tail(3).values.tolist()
+        print("Retraining regression model...")
+        data, cursor = read_levels(LOG_FOLDER)
+        if TRAINING_MODE == "incremental":
+            base = NoiseForecaster.empty(trees_per_update=TREES_PER_UPDATE, max_members=MAX_MEMBERS)
+        else:
+            base = NoiseForecaster.empty(trees_per_update=100, max_members=1)
+
+    required_columns = ['Timestamp', 'LZeq', 'LAeq', 'LAmax']
+    if not all(col in data.columns for col in required_columns):
+        print("No 1-minute levels to train on yet.")
+        return None
+
+    forecaster = base.updated(data, cursor)
+    if forecaster is None:
+        print("Not enough data to train (needs 2+ hours of 1-minute levels).")
+        return None
 
+    metrics = forecaster.metrics
+    print(f"Model evaluation ({metrics['samples']} samples, {len(forecaster.ensemble.members)} forests): "
+          f"MAE: {metrics['MAE']:.2f}, MSE: {metrics['MSE']:.2f}, R2: {metrics['R2']:.2f}")
+    if not metrics["finite"] or not np.isfinite(metrics["R2"]) or metrics["R2"] < MIN_R2:
+        print(f"New model rejected (R2 {metrics['R2']:.2f} < {MIN_R2:.2f}), keeping the current one.")
+        return None
+    return forecaster
+
+# Called on the trainer thread after the new model is live: persist it for the next start, then forecast
+def on_model_swapped(forecaster):
+    joblib.dump(forecaster, MODEL_FILE)
+    print(f"Model swapped in: {len(forecaster.ensemble.estimators_)} trees")
+    forecast_requested.set()
+
+trainer = BackgroundTrainer(train_model, debounce=RETRAIN_DEBOUNCE, on_swap=on_model_swapped, name="noise-trainer")
+
+# The disk copy is only read once at startup; afterwards the in-memory model is authoritative
+if os.path.exists(MODEL_FILE):
+    try:
+        saved = joblib.load(MODEL_FILE)
+        # Older versions counted consumed rows in `cursor`; rows are now tracked by Timestamp
+        if isinstance(saved, NoiseForecaster) and hasattr(saved, "horizons") and not isinstance(saved.cursor, int):
+            trainer.set_model(saved)
+            print(f"Loaded model from {MODEL_FILE}")
+        else:
+            print(f"Ignoring {MODEL_FILE}: saved by an older version, retraining")
+    except Exception as e:
+        print(f"Could not load {MODEL_FILE}: {e}")
 
 def predict_time_to_50dB():
     print("Do forecastin")
-    print(get_last_3_readings())
+    model = trainer.model
+    if model is None:
+        print("No model trained yet.")
+        return
     try:
-        model = joblib.load(MODEL_FILE)
-        last_3_readings = get_last_3_readings()
-        
-        input_data = np.array([np.array(last_3_readings).flatten()])
-        predicted_time = 0
-        
-        while input_data[0, 0] < 50:
-            predicted_spl = model.predict(input_data)[0]
-            predicted_time += 1  # Increase time step
-            input_data[0, 2] += 1  # Update time feature
-            input_data[0, 0] = predicted_spl  # Update SPL value
-
-            if predicted_time > 120:  # Limit to 2 hours max
-                print("Prediction too far in the future, aborting.")
+        # Only the newest `window` minutes are read, however long the levels log has grown
+        x = model.latest_input(read_levels_tail(LOG_FOLDER, model.window))
+        if x is None:
+            print(f"Need the last {model.window} minutes of levels without gaps to forecast.")
+            return
+
+        current_level = x.reshape(model.window, -1)[-1, 0]  # LZeq of the latest minute
+        if current_level >= THRESHOLD_DB:
+            message = f"SPL predicted to exceed {THRESHOLD_DB} dB in 0 minutes."
+        else:
+            # Whole 1..120 minute trajectory in one batched prediction, band from the spread of the trees
+            result = model.forecast(x, threshold=THRESHOLD_DB)
+            predicted_time, earliest, latest = result["crossing"], result["earliest"], result["latest"]
+            if predicted_time is None:
+                if earliest is not None:
+                    print(f"Unlikely to exceed {THRESHOLD_DB} dB within 2 hours (possible from {earliest} minutes).")
+                else:
+                    print("Prediction too far in the future, aborting.")
                 return
-        
-        message = f"SPL predicted to exceed 50 dB in {predicted_time} minutes."
+            band = f"likely between {earliest} and {latest} minutes" if latest is not None else f"possibly from {earliest} minutes"
+            message = f"SPL predicted to exceed {THRESHOLD_DB} dB in {predicted_time} minutes ({band})."
         client.publish(MQTT_TOPIC_ALERT, message)
         print(f"MQTT Alert sent: {message}")
         
@@ -100,7 +119,18 @@ def predict_time_to_50dB():
 
 def on_message(client, userdata, msg):
     if msg.topic == MQTT_TOPIC_RETRAIN and msg.payload.decode() == "Retrain model":
-        train_model()
+        # Never fit or forecast on the MQTT network thread: hand both off to worker threads
+        trainer.request()
+        forecast_requested.set()
+
+# Forecast worker: requests arriving while a forecast runs are coalesced into one more run
+forecast_requested = threading.Event()
+
+def forecast_loop():
+    while True:
+        forecast_requested.wait()
+        forecast_requested.clear()
+        predict_time_to_50dB()
 
 # MQTT Client Setup
 client = mqtt.Client()
@@ -108,6 +138,11 @@ client.on_message = on_message
 client.connect(MQTT_BROKER, MQTT_PORT, 60)
 client.subscribe(MQTT_TOPIC_RETRAIN)
 
+trainer.start()
+threading.Thread(target=forecast_loop, name="noise-forecast", daemon=True).start()
+# Catch up on readings logged while this script was not running
+trainer.request()
+
 print("Listening for retrain requests...")
 
 client.loop_forever()
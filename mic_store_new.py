@@ -1,11 +1,14 @@
 import numpy as np
 import sounddevice as sd
 import datetime
-import csv
 import os
 import paho.mqtt.client as mqtt
 import time
 import json
+import threading
+from audio_features import NoiseLevelMonitor
+from audio_log import LEVELS_PREFIX, AudioLogReader, AudioLogWriter
+from audio_rollup import ROLLUP_FILE, AudioRollup
 
 # Konfiguration
 MQTT_BROKER = "172.20.10.2"
@@ -13,8 +16,10 @@ MQTT_PORT = 1883
 MQTT_TOPIC_RETRAIN = "audio/retrain"  
 MQTT_TOPIC_ALERT = "sensor/SoundAlert" 
 NOISE_STATUS_ALERT = "sensor/noise_status" 
-MAX_LOG_ENTRIES = 1000  
-DELETE_ENTRIES = 100  
+SEGMENT_ROWS = 5000  # ~4 Minuten bei ~21 Zeilen/s; danach neue Segmentdatei + Retrain
+RETENTION_SEGMENTS = 12  # Anzahl der Segmente, die behalten werden
+LEVELS_SEGMENT_ROWS = 1440  # 1-Minuten-Pegel: ein Segment pro Tag
+LEVELS_RETENTION_SEGMENTS = 30  # 30 Tage Pegel behalten (Training und Prognose)
 
 client = mqtt.Client()
 client.connect(MQTT_BROKER, MQTT_PORT, 60)
@@ -22,40 +27,68 @@ client.connect(MQTT_BROKER, MQTT_PORT, 60)
 samplerate = 44100
 frame_length = 2048
 
-# Log-Datei
+# Log-Ordner: append-only Segmentdateien, geschrieben von einem Hintergrund-Thread
 log_folder = "audio_logs"
-os.makedirs(log_folder, exist_ok=True)
-log_filename = os.path.join(log_folder, "audio_log.csv")
 
-if not os.path.exists(log_filename):
-    with open(log_filename, mode='w', newline='') as file:
-        writer = csv.writer(file)
-        writer.writerow(["Timestamp", "Actual SPL (dB)", "Rate of Change", "Label (1=problematic,0=not problematic)", "Target Value"])
+# A-bewertete Pegel: LAeq/LAmax/Oktavbänder pro 1 s und 1 min; Minutenwerte werden in eigene
+# Segmentdateien (noise_levels.<Zeit>_<n>.csv) geschrieben, mit Rotation und Aufbewahrung wie das Audio-Log
+level_monitor = NoiseLevelMonitor(samplerate, frame_length, windows=(1, 60))
+levels_writer = AudioLogWriter(log_folder, segment_rows=LEVELS_SEGMENT_ROWS, segment_seconds=86400,
+                               retention_segments=LEVELS_RETENTION_SEGMENTS, prefix=LEVELS_PREFIX,
+                               headers=["Timestamp", "LAeq", "LZeq", "LAmax"]
+                               + [f"L{c}Hz" for c in level_monitor.extractor.centres])
+latest_levels = {}  # letzter abgeschlossener Datensatz je Fensterlänge
+
+# Ringpuffer zwischen Audio-Callback (Producer) und Verarbeitungs-Thread (Consumer).
+# Vorab allokiert, damit der Callback weder allokiert noch Locks nimmt: er schreibt nur
+# SPL + Zeitstempel in den nächsten Slot und erhöht ring_head (ein Producer, ein Consumer).
+RING_SIZE = 1024  # ~48 s Audio bei 2048 Samples/Block
+ring_spl = np.zeros(RING_SIZE, dtype=np.float64)
+ring_time = np.zeros(RING_SIZE, dtype=np.float64)
+ring_energy = np.zeros((RING_SIZE, level_monitor.extractor.n_features), dtype=np.float64)  # Z, A, Oktavbänder
+ring_head = 0  # Anzahl der vom Callback geschriebenen Blöcke
+
+# Zähler für PortAudio-Statusflags und für Blöcke, die der Consumer nicht rechtzeitig gelesen hat
+status_counts = {"input_overflow": 0, "input_underflow": 0, "ring_overrun": 0}
+STATUS_REPORT_INTERVAL = 60  # Sekunden
 
 warning_sent = False
 alert_sent = False
 prev_spl_actual = None  # vorheriger SPL-Wert
 
-def maintain_log_size():
-    with open(log_filename, mode='r', newline='') as file:
-        lines = file.readlines()
-    
-    if len(lines) > MAX_LOG_ENTRIES:
-        with open(log_filename, mode='w', newline='') as file:
-            file.writelines(lines[:1] + lines[(DELETE_ENTRIES + 1):])  
-        
-        client.publish(MQTT_TOPIC_RETRAIN, "Retrain model")
-        print("MQTT: Retrain model message sent")
+# Nach jedem abgeschlossenen Segment das Modell neu trainieren lassen
+def on_segment_rotated(closed_segment):
+    client.publish(MQTT_TOPIC_RETRAIN, "Retrain model")
+    print(f"MQTT: Retrain model message sent ({os.path.basename(closed_segment)} closed)")
+
+log_writer = AudioLogWriter(log_folder, segment_rows=SEGMENT_ROWS, retention_segments=RETENTION_SEGMENTS,
+                            on_rotate=on_segment_rotated)
 
+# Verdichtete Pegel (Mittelwert, Maximum, Leq) pro 1 s, 1 min und 1 h in audio_rollup.db, laufend
+# vom Consumer-Thread aktualisiert; Graph und Auswertungen lesen die passende Stufe statt der Rohdaten.
+# Beim ersten Start werden die vorhandenen Log-Segmente einmalig übernommen.
+rollup = AudioRollup(os.path.join(log_folder, ROLLUP_FILE))
+print(f"Rollup: {rollup.migrate_log(AudioLogReader(log_folder))} Messwerte aus vorhandenen Logs übernommen")
+
+# Echtzeit-Callback: nur DSP (SPL + Band-Energien) berechnen und in den Ringpuffer schreiben
 def audio_callback(indata, frames, time_info, status):
-    global warning_sent, alert_sent, prev_spl_actual
-    
+    global ring_head
+
     if status:
-        print(status)
+        if status.input_overflow:
+            status_counts["input_overflow"] += 1
+        if status.input_underflow:
+            status_counts["input_underflow"] += 1
+
+    slot = ring_head % RING_SIZE
+    ring_energy[slot] = level_monitor.extractor.block_energy(indata)
+    ring_spl[slot] = 10 * np.log10(ring_energy[slot, 0] + 1e-24) + 60  # = 20*log10(rms) + 60
+    ring_time[slot] = time.time()
+    ring_head += 1
 
-    y = np.mean(indata, axis=1)
-    rms = np.sqrt(np.mean(y**2))
-    spl_actual = 20 * np.log10(rms + 1e-12) + 60
+# Ein SPL-Wert: loggen, Schwellwert-Hysterese prüfen und ggf. per MQTT melden
+def process_reading(spl_actual, reading_time):
+    global alert_sent, prev_spl_actual
 
     roc = 0.0 if prev_spl_actual is None else spl_actual - prev_spl_actual
     prev_spl_actual = spl_actual
@@ -63,13 +96,9 @@ def audio_callback(indata, frames, time_info, status):
     # Label
     label = 1 if spl_actual >= 55 else 0
 
-    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    timestamp = datetime.datetime.fromtimestamp(reading_time).strftime("%Y-%m-%d %H:%M:%S")
     
-    with open(log_filename, mode='a', newline='') as file:
-        writer = csv.writer(file)
-        writer.writerow([timestamp, spl_actual, roc, label, spl_actual])  # spl_actual als Target Value speichern
-
-    maintain_log_size()
+    log_writer.write([timestamp, spl_actual, roc, label, spl_actual])  # spl_actual als Target Value speichern
 
    # print(f"{timestamp} | actual: {spl_actual:.2f} dB | RoC: {roc:.2f} | label: {label}")
     # Alert at 50 dB
@@ -95,7 +124,49 @@ def audio_callback(indata, frames, time_info, status):
         alert_sent = False  
         print("Clear message sent")
     print(spl_actual)
-    #time.sleep(0.5)
+
+# Abgeschlossene 1-Minuten-Pegel protokollieren (einmal pro Minute, über den Segment-Writer)
+def log_levels(record):
+    timestamp = datetime.datetime.fromtimestamp(record["start"]).strftime("%Y-%m-%d %H:%M:%S")
+    levels = [record['LAeq'], record['LZeq'], record['LAmax']] + list(record["bands"].values())
+    levels_writer.write([timestamp] + [f"{level:.2f}" for level in levels])
+    print(f"1-min LAeq {record['LAeq']:.1f} dB(A), LAmax {record['LAmax']:.1f} dB(A)")
+
+# Fenster-Akkumulatoren mit einem Stapel neuer Blöcke füttern (vektorisiert)
+def process_levels(slots):
+    closed = level_monitor.add_energies(ring_energy[slots], ring_time[slots])
+    for seconds, records in closed.items():
+        if records:
+            latest_levels[seconds] = records[-1]
+    for record in closed.get(60, []):
+        log_levels(record)
+
+# Consumer-Thread: liest neue Blöcke aus dem Ringpuffer und erledigt alles außer DSP
+def consumer_loop():
+    ring_tail = 0
+    last_report = time.monotonic()
+    while True:
+        head = ring_head
+        if head - ring_tail > RING_SIZE:
+            # Callback war eine ganze Runde voraus: die ältesten Werte sind überschrieben
+            status_counts["ring_overrun"] += head - ring_tail - RING_SIZE
+            ring_tail = head - RING_SIZE
+        if ring_tail < head:
+            slots = np.arange(ring_tail, head) % RING_SIZE
+            process_levels(slots)
+            rollup.add_many(ring_spl[slots], ring_time[slots])
+        while ring_tail < head:
+            slot = ring_tail % RING_SIZE
+            process_reading(float(ring_spl[slot]), float(ring_time[slot]))
+            ring_tail += 1
+
+        if time.monotonic() - last_report >= STATUS_REPORT_INTERVAL:
+            print(f"Audio status: {ring_head} blocks, {status_counts}, log queue drops: {log_writer.dropped}")
+            last_report = time.monotonic()
+        time.sleep(0.05)
+
+threading.Thread(target=consumer_loop, name="audio-consumer", daemon=True).start()
+
 with sd.InputStream(callback=audio_callback, channels=1, samplerate=samplerate, blocksize=frame_length):
     print("Audio monitoring is running. Stop with Ctrl+C.")
     while True:
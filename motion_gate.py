@@ -0,0 +1,138 @@
+import cv2
+import numpy as np
+
+# Empty result in the same shape detectMultiScale returns boxes in (x, y, w, h)
+NO_BOXES = np.empty((0, 4), dtype=np.int32)
+
+# Smallest region the default people detector can score (its window is 64x128)
+HOG_WINDOW = (64, 128)
+
+
+class MotionGate:
+    """Cascaded person detector: motion check -> HOG on moving regions -> presence cache.
+
+    1. Each frame is downscaled to gray and compared against a running-average
+       background. Frames with no motion reuse the last verdict instead of
+       running HOG (an empty scene stays empty; a person verdict is reused for
+       up to `cache_frames` frames before being re-verified).
+    2. When motion is found, HOG only runs on the bounding box of the moving
+       regions (or the full frame when motion covers most of it).
+
+    `stats` counts how many frames each stage settled, so the saving can be measured.
+    """
+
+    def __init__(self, scale=4, motion_threshold=25, min_motion_ratio=0.002,
+                 cache_frames=5, alpha=0.2, full_frame_ratio=0.6, win_stride=(8, 8)):
+        self.scale = scale
+        self.motion_threshold = motion_threshold
+        self.min_motion_ratio = min_motion_ratio
+        self.cache_frames = cache_frames
+        self.alpha = alpha
+        self.full_frame_ratio = full_frame_ratio
+        self.win_stride = win_stride
+
+        self.hog = cv2.HOGDescriptor()
+        self.hog.setSVMDetector(cv2.HOGDescriptor_getDefaultPeopleDetector())
+
+        self.background = None
+        self.last_boxes = NO_BOXES
+        self.verdict_age = 0
+        self.stats = {
+            "frames": 0,
+            "rejected_by_motion": 0,   # static scene, last verdict was "no person"
+            "served_from_cache": 0,    # static scene, recent "person" verdict reused
+            "rejected_by_hog": 0,      # HOG ran (ROI or full frame) and found nobody
+            "hog_roi_runs": 0,
+            "hog_full_runs": 0,
+            "person_frames": 0,
+        }
+
+    def reset(self):
+        self.background = None
+        self.last_boxes = NO_BOXES
+        self.verdict_age = 0
+
+    # Bounding box (x, y, w, h) of the moving pixels in full-frame coordinates, or None if static
+    def _motion_region(self, gray):
+        small = cv2.resize(gray, (gray.shape[1] // self.scale, gray.shape[0] // self.scale),
+                           interpolation=cv2.INTER_AREA)
+        small = cv2.GaussianBlur(small, (5, 5), 0)
+
+        if self.background is None:
+            self.background = small.astype(np.float32)
+            return 0, 0, gray.shape[1], gray.shape[0]  # First frame: treat everything as new
+
+        diff = cv2.absdiff(small, cv2.convertScaleAbs(self.background))
+        cv2.accumulateWeighted(small, self.background, self.alpha)
+        _, mask = cv2.threshold(diff, self.motion_threshold, 255, cv2.THRESH_BINARY)
+        if cv2.countNonZero(mask) < self.min_motion_ratio * mask.size:
+            return None
+
+        x, y, w, h = cv2.boundingRect(cv2.dilate(mask, None, iterations=2))
+        return x * self.scale, y * self.scale, w * self.scale, h * self.scale
+
+    # Grow a region to fit at least one HOG window plus a margin. Near an edge the window is shifted
+    # back into the frame rather than cut off, so it only ends up smaller than HOG_WINDOW if the frame is.
+    @staticmethod
+    def _pad_region(region, frame_w, frame_h):
+        x, y, w, h = region
+        w_pad = min(frame_w, max(w + 32, HOG_WINDOW[0] + 16))
+        h_pad = min(frame_h, max(h + 32, HOG_WINDOW[1] + 16))
+        x0 = max(0, min(x - (w_pad - w) // 2, frame_w - w_pad))
+        y0 = max(0, min(y - (h_pad - h) // 2, frame_h - h_pad))
+        return x0, y0, x0 + w_pad, y0 + h_pad
+
+    def _run_hog(self, gray, region):
+        frame_h, frame_w = gray.shape[:2]
+        x0, y0, x1, y1 = self._pad_region(region, frame_w, frame_h)
+
+        # detectMultiScale on an image smaller than its window crashes the process (opencv 4.9)
+        too_small = x1 - x0 < HOG_WINDOW[0] or y1 - y0 < HOG_WINDOW[1]
+        if too_small or (x1 - x0) * (y1 - y0) >= self.full_frame_ratio * frame_w * frame_h:
+            self.stats["hog_full_runs"] += 1
+            boxes, _ = self.hog.detectMultiScale(gray, winStride=self.win_stride)
+            return np.asarray(boxes, dtype=np.int32).reshape(-1, 4)
+
+        self.stats["hog_roi_runs"] += 1
+        boxes, _ = self.hog.detectMultiScale(gray[y0:y1, x0:x1], winStride=self.win_stride)
+        boxes = np.asarray(boxes, dtype=np.int32).reshape(-1, 4)
+        if len(boxes):
+            boxes[:, 0] += x0
+            boxes[:, 1] += y0
+        return boxes
+
+    # Person boxes (x, y, w, h) for a BGR frame; an empty array means nobody was found
+    def detect(self, image_frame):
+        self.stats["frames"] += 1
+        gray = cv2.cvtColor(image_frame, cv2.COLOR_BGR2GRAY)
+        region = self._motion_region(gray)
+
+        if region is None:
+            if len(self.last_boxes) == 0:
+                self.stats["rejected_by_motion"] += 1
+                return NO_BOXES
+            if self.verdict_age < self.cache_frames:
+                self.verdict_age += 1
+                self.stats["served_from_cache"] += 1
+                self.stats["person_frames"] += 1
+                return self.last_boxes
+            # Cached person verdict expired: re-verify on the whole frame
+            region = (0, 0, gray.shape[1], gray.shape[0])
+
+        boxes = self._run_hog(gray, region)
+        self.last_boxes = boxes
+        self.verdict_age = 0
+        if len(boxes):
+            self.stats["person_frames"] += 1
+        else:
+            self.stats["rejected_by_hog"] += 1
+        return boxes
+
+    def stats_summary(self):
+        frames = max(1, self.stats["frames"])
+        hog_runs = self.stats["hog_roi_runs"] + self.stats["hog_full_runs"]
+        return (f"{self.stats['frames']} frames, HOG skipped on {100 * (1 - hog_runs / frames):.0f}% "
+                f"(motion: {self.stats['rejected_by_motion']}, cache: {self.stats['served_from_cache']}), "
+                f"HOG ROI/full: {self.stats['hog_roi_runs']}/{self.stats['hog_full_runs']}, "
+                f"HOG rejected: {self.stats['rejected_by_hog']}")
+
@@ -0,0 +1,160 @@
+import numpy as np
+import pandas as pd
+from collections import deque
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.model_selection import train_test_split
+from feature_engineering import create_horizon_features
+
+# Per-minute features from the noise_levels segments (see mic_store_new.py) plus the time of day.
+# LZeq is the unweighted level, i.e. the same quantity as the SPL the 50 dB alert uses.
+LEVEL_COLS = ['LZeq', 'LAeq', 'LAmax']
+FEATURE_COLS = LEVEL_COLS + ['DaySin', 'DayCos']
+TARGET_COL = 'LZeq'
+HORIZONS = np.arange(1, 121)  # minutes ahead
+
+
+# Levels rows -> features on a regular 1-minute grid (missing minutes become NaN rows)
+def minute_features(data):
+    data = data.dropna(subset=['Timestamp'] + LEVEL_COLS)
+    index = pd.to_datetime(data['Timestamp']).dt.floor('min')
+    features = pd.DataFrame(data[LEVEL_COLS].to_numpy(dtype=np.float64), index=index, columns=LEVEL_COLS)
+    features = features[~features.index.duplicated(keep='last')].sort_index()
+    if features.empty:
+        return pd.DataFrame(columns=FEATURE_COLS)
+    features = features.asfreq('min')
+    day = (features.index.hour * 60 + features.index.minute) / 1440 * 2 * np.pi
+    features['DaySin'] = np.sin(day)
+    features['DayCos'] = np.cos(day)
+    return features
+
+
+class SlidingForestEnsemble:
+    """Random forest built from per-update members, keeping only the newest ones.
+
+    Each update fits a small forest on the new rows only and appends it; once
+    max_members forests exist the oldest is dropped, so memory and prediction
+    cost are bounded and old behaviour ages out. extended() returns a new
+    ensemble sharing the (immutable) fitted members, so a candidate can be
+    validated and then swapped in without touching the live one.
+    With max_members=1 every update is a plain full refit.
+    """
+
+    def __init__(self, trees_per_update=20, max_members=8, random_state=42, members=()):
+        self.trees_per_update = trees_per_update
+        self.max_members = max_members
+        self.random_state = random_state
+        self.members = deque(members, maxlen=max_members)
+        self.updates = 0
+
+    def extended(self, X, y):
+        member = RandomForestRegressor(n_estimators=self.trees_per_update, min_samples_leaf=2,
+                                       random_state=self.random_state + self.updates)
+        member.fit(X, y)
+        ensemble = SlidingForestEnsemble(self.trees_per_update, self.max_members, self.random_state,
+                                         list(self.members) + [member])
+        ensemble.updates = self.updates + 1
+        return ensemble
+
+    # All trees of all members, oldest first
+    @property
+    def estimators_(self):
+        return [tree for member in self.members for tree in member.estimators_]
+
+    # Average over all trees, i.e. members weighted by their tree count
+    def predict(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        total = sum(member.n_estimators * member.predict(X) for member in self.members)
+        return total / sum(member.n_estimators for member in self.members)
+
+    # (trees, samples, outputs) predictions of every tree, for spread / confidence bands
+    def predict_trees(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        predictions = np.stack([tree.predict(X) for tree in self.estimators_])
+        return predictions.reshape(predictions.shape[0], X.shape[0], -1)
+
+
+class NoiseForecaster:
+    """Direct multi-horizon noise forecast: the next 1..120 minutes of LZeq in one call.
+
+    A multi-output forest maps the last `window` minutes of levels to the level
+    at every horizon, so the whole trajectory comes out of a single batched
+    prediction instead of feeding predictions back step by step, and errors do
+    not compound. The spread of the individual trees gives the confidence band.
+
+    The object is never modified once built: updated() returns a new forecaster
+    with one more ensemble member trained on just the samples completed by the
+    new rows. The last window + max horizon - 1 minutes are kept as context so
+    no sample is lost between updates, and `cursor` is the Timestamp of the
+    newest levels row consumed (see audio_log.read_levels).
+    """
+
+    def __init__(self, ensemble, window=10, horizons=HORIZONS, context=None, cursor=None, metrics=None):
+        self.ensemble = ensemble
+        self.window = window
+        self.horizons = np.asarray(horizons)
+        self.context = context if context is not None else pd.DataFrame(columns=FEATURE_COLS)
+        self.cursor = cursor
+        self.metrics = metrics or {}
+
+    @classmethod
+    def empty(cls, trees_per_update=20, max_members=8, window=10, horizons=HORIZONS):
+        return cls(SlidingForestEnsemble(trees_per_update, max_members), window, horizons)
+
+    @property
+    def trained(self):
+        return len(self.ensemble.members) > 0
+
+    # New forecaster trained on `data` (new levels rows); None if they complete too few samples.
+    # 20% of the new samples are held out to evaluate the updated ensemble.
+    def updated(self, data, cursor=None, min_samples=30):
+        rows = pd.concat([self.context, minute_features(data)])
+        rows = rows[~rows.index.duplicated(keep='last')].sort_index()
+        if not rows.empty:
+            rows = rows.asfreq('min')
+        X, Y = create_horizon_features(rows, window=self.window, horizons=self.horizons, target_col=TARGET_COL)
+        complete = X.notna().all(axis=1) & Y.notna().all(axis=1)
+        X, Y = X[complete], Y[complete]
+        if len(X) < min_samples:
+            return None
+
+        X_train, X_test, Y_train, Y_test = train_test_split(X, Y, test_size=0.2, random_state=42)
+        ensemble = self.ensemble.extended(X_train.to_numpy(), Y_train.to_numpy())
+        Y_pred = ensemble.predict(X_test.to_numpy())
+        metrics = {
+            "samples": len(X),
+            "MAE": mean_absolute_error(Y_test, Y_pred),
+            "MSE": mean_squared_error(Y_test, Y_pred),
+            "R2": r2_score(Y_test, Y_pred),
+            "finite": bool(np.all(np.isfinite(Y_pred))),
+        }
+        context = rows.iloc[-(self.window + int(self.horizons.max()) - 1):]
+        return NoiseForecaster(ensemble, self.window, self.horizons, context, cursor, metrics)
+
+    # Feature row for the most recent `window` minutes of `data`; None if any of them is missing
+    def latest_input(self, data):
+        rows = minute_features(data).iloc[-self.window:].to_numpy(dtype=np.float64)
+        if len(rows) < self.window or np.isnan(rows).any():
+            return None
+        return rows.reshape(1, -1)
+
+    # Trajectory for one input row: mean, low/high quantiles across trees and the first crossing of
+    # `threshold` (minutes ahead) for the mean and for each band edge (None = not within the horizon)
+    def forecast(self, x, threshold=50.0, band=(10, 90)):
+        trees = self.ensemble.predict_trees(x)[:, 0, :]
+        mean = trees.mean(axis=0)
+        low, high = np.percentile(trees, band, axis=0)
+
+        def first_crossing(trajectory):
+            above = np.flatnonzero(trajectory >= threshold)
+            return int(self.horizons[above[0]]) if len(above) else None
+
+        return {
+            "horizons": self.horizons,
+            "mean": mean,
+            "low": low,
+            "high": high,
+            "crossing": first_crossing(mean),
+            "earliest": first_crossing(high),
+            "latest": first_crossing(low),
+        }
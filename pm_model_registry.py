@@ -0,0 +1,160 @@
+import glob
+import hashlib
+import json
+import os
+import time
+
+import pandas as pd
+
+from feature_engineering import create_lag_features
+from pm_store import PMStore
+
+HISTORY_FILE = "psi_df_2016_2019.csv"
+MODEL_DIR = "pm_models"
+FEATURE_COLS = ['national', 'year', 'month', 'day', 'hour']
+# Bump whenever the feature pipeline changes so that older artifacts stop matching
+FEATURE_VERSION = 3
+DEFAULT_PARAMS = {"window": 3, "horizon": 5, "n_estimators": 100, "random_state": 42, "test_size": 0.2}
+
+
+def _hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, mode='rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Key of a model trained on the history file, the sensor feature rows `sensor` and `params`
+def training_key(history_path, sensor, params):
+    digest = hashlib.sha256()
+    digest.update(json.dumps({"params": params, "features": FEATURE_VERSION}, sort_keys=True).encode())
+    digest.update(_hash_file(history_path).encode())
+    digest.update(pd.util.hash_pandas_object(sensor[['ts'] + FEATURE_COLS], index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+# Historical PSI readings plus the hourly sensor features (PMStore.ml_features), with time features
+def load_training_frame(history_path, sensor):
+    history = pd.read_csv(history_path)
+    history['timestamp'] = pd.to_datetime(history['timestamp'])
+    history['year'] = history['timestamp'].dt.year
+    history['month'] = history['timestamp'].dt.month
+    history['day'] = history['timestamp'].dt.day
+    history['hour'] = history['timestamp'].dt.hour
+    return pd.concat([history[FEATURE_COLS], sensor[FEATURE_COLS]], ignore_index=True)
+
+
+class PMModelRegistry:
+    """Trained PM2.5 models persisted on disk, keyed by what they were trained on.
+
+    Each artifact is a joblib model plus a JSON sidecar with its key: a hash of
+    the parameters, the feature version, the historical CSV and the hourly
+    sensor features (PMStore.ml_features) up to the last hour it was trained
+    on. Completed hours never change, so a cached model stays valid as new
+    hours are added; load() picks the newest valid artifact, so a restart costs
+    a hash and a joblib load instead of a full fit. new_rows() says how many
+    sensor hours arrived since, so the caller can decide when to retrain.
+    """
+
+    def __init__(self, folder=MODEL_DIR, history_path=HISTORY_FILE, store=None, params=None, keep=3):
+        self.folder = folder
+        self.history_path = history_path
+        self.store = store if store is not None else PMStore()
+        self.params = dict(DEFAULT_PARAMS, **(params or {}))
+        self.keep = keep
+        self.meta = None
+        os.makedirs(folder, exist_ok=True)
+
+    def _sidecars(self):
+        return sorted(glob.glob(os.path.join(self.folder, "pm_model-*.json")), key=os.path.getmtime, reverse=True)
+
+    def _is_valid(self, meta):
+        if meta.get("params") != self.params or meta.get("features") != FEATURE_VERSION:
+            return False
+        sensor = self.store.ml_features(until=meta["sensor_until"])
+        return training_key(self.history_path, sensor, self.params) == meta["key"]
+
+    # Newest artifact whose key still matches the data on disk, or None
+    def load(self):
+        import joblib
+
+        for sidecar in self._sidecars():
+            try:
+                with open(sidecar) as file:
+                    meta = json.load(file)
+                if not self._is_valid(meta):
+                    continue
+                model = joblib.load(os.path.join(self.folder, meta["model_file"]))
+            except Exception as e:
+                print(f"Skipping PM model artifact {os.path.basename(sidecar)}: {e}")
+                continue
+            self.meta = meta
+            return model
+        return None
+
+    # Completed sensor hours added since the current model was trained (all of them if there is none)
+    def new_rows(self):
+        return len(self.store.ml_features(after=self.meta["sensor_until"] if self.meta else None))
+
+    # Fit on the history plus every completed sensor hour and persist the artifact.
+    # Returns (model, metrics); the caller decides whether to use it via accept(metrics).
+    def train(self, accept=None):
+        from sklearn.ensemble import RandomForestRegressor
+        from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+        from sklearn.model_selection import train_test_split
+        import joblib
+
+        sensor = self.store.ml_features()
+        sensor_until = int(sensor['ts'].iloc[-1]) if len(sensor) else -1
+        key = training_key(self.history_path, sensor, self.params)
+        df = load_training_frame(self.history_path, sensor)
+        X, y = create_lag_features(df[FEATURE_COLS], window=self.params["window"],
+                                   horizon=self.params["horizon"], target_cols='national')
+
+        X_train, X_test, y_train, y_test = train_test_split(
+            X, y, test_size=self.params["test_size"], random_state=self.params["random_state"])
+        model = RandomForestRegressor(n_estimators=self.params["n_estimators"],
+                                      random_state=self.params["random_state"])
+        model.fit(X_train, y_train)
+
+        y_pred = model.predict(X_test)
+        metrics = {
+            "MAE": float(mean_absolute_error(y_test, y_pred)),
+            "MSE": float(mean_squared_error(y_test, y_pred)),
+            "R2": float(r2_score(y_test, y_pred)),
+            "rows": len(df),
+        }
+        if accept is not None and not accept(metrics):
+            return None, metrics
+
+        # Model first, sidecar last (both via rename) so a sidecar never points at a partial file
+        name = f"pm_model-{key[:16]}"
+        model_path = os.path.join(self.folder, name + ".joblib")
+        joblib.dump(model, model_path + ".tmp")
+        os.replace(model_path + ".tmp", model_path)
+        meta = {
+            "key": key,
+            "params": self.params,
+            "features": FEATURE_VERSION,
+            "sensor_until": sensor_until,
+            "model_file": name + ".joblib",
+            "metrics": metrics,
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        sidecar = os.path.join(self.folder, name + ".json")
+        with open(sidecar + ".tmp", mode='w') as file:
+            json.dump(meta, file, indent=2)
+        os.replace(sidecar + ".tmp", sidecar)
+        self.meta = meta
+        self._prune()
+        return model, metrics
+
+    # Keep only the newest `keep` artifacts
+    def _prune(self):
+        for sidecar in self._sidecars()[self.keep:]:
+            for path in (sidecar, sidecar[:-len(".json")] + ".joblib"):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
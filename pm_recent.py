@@ -0,0 +1,47 @@
+import json
+import threading
+from collections import deque
+
+from pm_store import format_timestamp
+
+
+class RecentReadings:
+    """Fixed-size in-memory buffer of the newest PM readings.
+
+    The acquisition loop add()s each reading as it stores it, and the
+    topic/getPM reply (the newest `reply_size` readings as JSON) is serialized
+    right there, once per reading. Request handlers on the MQTT thread then
+    only return the prepared bytes or copy the buffer; they never touch the
+    disk. seed() fills the buffer from the store at startup.
+    """
+
+    def __init__(self, capacity=30, reply_size=5):
+        self.capacity = capacity
+        self.reply_size = reply_size
+        self.rows = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._reply = b"[]"
+
+    # row: {"ts": epoch ms, "status": ..., "pm2_5": ...} as stored in PMStore
+    def add(self, row):
+        entry = {"timestamp": format_timestamp(row["ts"]), "status": row.get("status"), "pm2_5": row["pm2_5"],
+                 "ts": row["ts"]}
+        with self._lock:
+            self.rows.append(entry)
+            newest = list(self.rows)[-self.reply_size:]
+        self._reply = json.dumps([{key: r[key] for key in ("timestamp", "status", "pm2_5")} for r in newest]).encode()
+
+    def seed(self, store):
+        for row in store.last(self.capacity):
+            self.add(row)
+        return len(self.rows)
+
+    # Pre-serialized JSON list of the newest `reply_size` readings (timestamp, status, pm2_5)
+    def reply(self):
+        return self._reply
+
+    # Copy of the newest `n` entries (all if None), oldest first
+    def latest(self, n=None):
+        with self._lock:
+            rows = list(self.rows)
+        return rows if n is None else rows[-n:]
@@ -1,149 +1,158 @@
-import serial
-import struct
 import paho.mqtt.client as mqtt
 import time
 import json
-import csv
 import os
-import pandas as pd
-import matplotlib.pyplot as plt
 from datetime import datetime, timedelta, timezone
+from graph_renderer import GraphRenderer, LineChart
+from pms5003 import FrameAverager, PMS5003Parser, replay
+from pm_store import LOCAL_TZ, PMStore
+from pm_recent import RecentReadings
 
 # Serial connection details
 SERIAL_PORT = "/dev/serial0"  # Use "/dev/ttyS0" if needed
 BAUD_RATE = 9600
 PM_THRESHOLD = 5  #for testing purpose, actual dangerous level is above 55
 
+# The sensor sends a frame about every second; every frame is parsed and combined into one
+# reading per PM_AVERAGE_SECONDS using PM_AVERAGE_POLICY (mean, max or latest)
+PM_AVERAGE_SECONDS = float(os.environ.get("PM_AVERAGE_SECONDS", "5"))
+PM_AVERAGE_POLICY = os.environ.get("PM_AVERAGE_POLICY", "mean")
+# Replay a recorded binary capture instead of the serial port / record the raw serial bytes
+PMS_REPLAY_FILE = os.environ.get("PMS_REPLAY_FILE")
+PMS_CAPTURE_FILE = os.environ.get("PMS_CAPTURE_FILE")
+
 # MQTT details
 MQTT_BROKER = "localhost"  # Change if using an external broker
 MQTT_PORT = 1883
 PM_STATUS_TOPIC = "sensor/pm_status"
 
-CSV_FILE = "pm_readings.csv" # to save readings and generate graphs
+# All readings go to one SQLite time-series store (pm_readings.db); pm_sensor_ML.py reads its
+# hourly ml_features view. Raw readings older than RAW_RETENTION_DAYS are dropped, hourly means kept.
+CSV_FILE = "pm_readings.csv"  # old CSV log, imported into the store once
+RETENTION_INTERVAL = 3600  # seconds between retention passes
 
-SENSOR_CSV_FILE = "sensor_readings.csv"  # CSV file to store sensor readings
+store = PMStore()
+migrated = store.migrate_csv(CSV_FILE)
+if migrated:
+    print(f"Imported {migrated} readings from {CSV_FILE} into {store.path}")
+last_retention = 0
 
-# Create CSV file with headers if it doesn't exist
-if not os.path.isfile(SENSOR_CSV_FILE):
-    with open(SENSOR_CSV_FILE, mode='w', newline='') as file:
-        writer = csv.DictWriter(file, fieldnames=["national", "year", "month", "day", "hour"])
-        writer.writeheader()
+# The newest readings are also kept in memory (with the getPM reply already serialized), so
+# request handlers answer without touching the database; seeded from it on startup
+recent = RecentReadings(capacity=30, reply_size=5)
+recent.seed(store)
 
 # Setup MQTT client
 client = mqtt.Client()
 client.connect(MQTT_BROKER, MQTT_PORT, 60)
 
+# The newest 30 readings for the graph, versioned by the newest timestamp so an unchanged graph is not redrawn
+def pm_graph_data():
+    rows = recent.latest(30)
+    return (rows[-1]["ts"] if rows else None), ([row["ts"] for row in rows], [row["pm2_5"] for row in rows])
+
+def publish_pm_graph(image_data):
+    client.publish("sensor/pm_graph", image_data)
+    print(f"Published graph image to sensor/pm_graph ({graph_renderer.last_render_ms.get('pm', 0):.1f} ms render)")
+
+# One render worker with a persistent figure; the PNG is rendered in memory and never written to disk
+graph_renderer = GraphRenderer()
+graph_renderer.add_chart("pm", lambda: LineChart("PM2.5 Readings Over Time", "PM2.5 (ug/m3)", marker='o', tz=LOCAL_TZ))
+graph_renderer.start()
+
 def on_message(client, userdata, msg):
     topic = msg.topic
     print(f"Received message on {topic}")
+    start = time.perf_counter()
 
     if topic == "topic/getPM":
-        df = pd.read_csv(CSV_FILE, parse_dates=["timestamp"])
-        df = df.sort_values(by="timestamp")
-        last_5 = df.tail(5).to_dict(orient="records")
-
-        # Convert Timestamp objects to strings
-        for row in last_5:
-            if isinstance(row["timestamp"], pd.Timestamp):
-                row["timestamp"] = row["timestamp"].strftime("%Y-%m-%d %H:%M:%S")
-
-        client.publish("sensor/pm_reading", json.dumps(last_5))
-        print("Published last 5 PM readings to sensor/pm_reading")
+        client.publish("sensor/pm_reading", recent.reply())
+        print(f"Published last 5 PM readings to sensor/pm_reading ({(time.perf_counter() - start) * 1e6:.0f} us)")
 
     elif topic == "topic/getGraph/pm":
-        df = pd.read_csv(CSV_FILE, parse_dates=["timestamp"])
-        df = df.sort_values(by="timestamp")
-        df = df.tail(30)
-
-        # Save graph
-        plt.figure(figsize=(10, 5))
-        plt.plot(df["timestamp"], df["pm2_5"], marker='o', linestyle='-')
-        plt.title("PM2.5 Readings Over Time")
-        plt.xlabel("Time")
-        plt.ylabel("PM2.5 (ug/m3)")
-        plt.xticks(rotation=45)
-        plt.grid(True)
-        plt.tight_layout()
-        plt.savefig("pm_graph.png")
-        plt.close()
-
-        with open("pm_graph.png", "rb") as f:
-            image_data = f.read()
-            client.publish("sensor/pm_graph", image_data)
-            print("Published graph image to sensor/pm_graph")
+        # Rendered on the graph worker; requests arriving meanwhile are coalesced into one render
+        graph_renderer.request("pm", pm_graph_data, publish_pm_graph)
 
 client.on_message = on_message
 client.subscribe("topic/getPM")
 client.subscribe("topic/getGraph/pm")
 client.loop_start()
 
-# Create CSV file with headers if it doesn't exist
-if not os.path.isfile(CSV_FILE):
-    with open(CSV_FILE, mode='w', newline='') as file:
-        writer = csv.writer(file)
-        writer.writerow(["timestamp", "status", "pm2_5"])
-
-try:
-    ser = serial.Serial(SERIAL_PORT, BAUD_RATE, timeout=5)
+# Publish and store one averaged reading
+def handle_reading(reading):
+    global last_retention
+    pm2_5_atm = reading["pm2_5_atm"]
+    print("PM2.5 (ATM):", pm2_5_atm, "ug/m3", f"({reading['frames']} frames)")
+
+    # Determine status based on PM2.5 threshold
+    status = "HIGH" if pm2_5_atm > PM_THRESHOLD else "LOW"
+
+    # Get current time in Singapore timezone (UTC+8)
+    sg_time = datetime.now(timezone(timedelta(hours=8)))
+    timestamp = sg_time.strftime("%Y-%m-%d %H:%M:%S")
+
+    # Create JSON payload
+    payload = {
+        "status": status,
+        "pm2_5": pm2_5_atm,
+        "timestamp": timestamp
+    }
+
+    # Publish PM2.5 status
+    client.publish(PM_STATUS_TOPIC, json.dumps(payload))
+    print(f"Published to {PM_STATUS_TOPIC}: {payload}")
+
+    # Store all three PM channels in one insert (the hourly rollup is updated in the same transaction)
+    ts_ms = int(sg_time.timestamp() * 1000)
+    store.add({
+        "pm1_0": reading["pm1_0_atm"],
+        "pm2_5": pm2_5_atm,
+        "pm10": reading["pm10_atm"],
+        "status": status,
+        "frames": reading["frames"],
+    }, ts_ms)
+    recent.add({"ts": ts_ms, "status": status, "pm2_5": pm2_5_atm})
+
+    if time.monotonic() - last_retention >= RETENTION_INTERVAL:
+        deleted = store.apply_retention()
+        if deleted:
+            print(f"Retention: removed {deleted} raw readings (hourly means kept)")
+        last_retention = time.monotonic()
+
+# Byte chunks from the serial port (whatever is waiting, blocking up to 1 s for more) or from a capture file
+def read_chunks():
+    if PMS_REPLAY_FILE:
+        print(f"Replaying PMS5003 capture {PMS_REPLAY_FILE}...")
+        yield from replay(PMS_REPLAY_FILE, realtime=True)
+        return
+
+    import serial
+
+    ser = serial.Serial(SERIAL_PORT, BAUD_RATE, timeout=1)
+    capture = open(PMS_CAPTURE_FILE, mode='ab') if PMS_CAPTURE_FILE else None
     print("Listening for PMS5003 sensor data... Press Ctrl+C to stop.")
+    try:
+        while True:
+            chunk = ser.read(max(ser.in_waiting, 1))
+            if capture is not None and chunk:
+                capture.write(chunk)
+            yield chunk
+    finally:
+        ser.close()
+        if capture is not None:
+            capture.close()
+
+parser = PMS5003Parser()
+averager = FrameAverager(PM_AVERAGE_SECONDS, PM_AVERAGE_POLICY)
 
-    while True:
-        header = ser.read(2)
-        if header == b'\x42\x4D':  # Valid header detected
-            frame = ser.read(30)
-            if len(frame) != 30:
-                print("Error: Incomplete frame received. Skipping...")
-                continue
-
-            try:
-                data = struct.unpack(">HHHHHHHHHHHHHH", frame[:28])  # Unpack 28 bytes
-                pm2_5_atm = data[4]  # Extract PM2.5 (ATM)
-
-                print("PM2.5 (ATM):", pm2_5_atm, "ug/m3")
-
-                # Determine status based on PM2.5 threshold
-                status = "HIGH" if pm2_5_atm > PM_THRESHOLD else "LOW"
-
-                # Get current time in Singapore timezone (UTC+8)
-                sg_time = datetime.now(timezone(timedelta(hours=8)))
-                timestamp = sg_time.strftime("%Y-%m-%d %H:%M:%S")
-
-                # Create JSON payload
-                payload = {
-                    "status": status,
-                    "pm2_5": pm2_5_atm,
-                    "timestamp": timestamp
-                }
-
-                # Prepare the reading to save to CSV
-                reading = {
-                    "national": pm2_5_atm,  # PM2.5 value
-                    "year": sg_time.year,    # Year from timestamp
-                    "month": sg_time.month,  # Month from timestamp
-                    "day": sg_time.day,      # Day from timestamp
-                    "hour": sg_time.hour,    # Hour from timestamp
-                }
-
-                # Publish PM2.5 status
-                client.publish(PM_STATUS_TOPIC, json.dumps(payload))
-                print(f"Published to {PM_STATUS_TOPIC}: {payload}")
-
-                # Append readings to CSV file
-                with open(CSV_FILE, mode='a', newline='') as file:
-                    writer = csv.writer(file)
-                    writer.writerow([timestamp, status, pm2_5_atm])
-
-                # Save readings for ML to CSV file
-                with open(SENSOR_CSV_FILE, mode='a', newline='') as file:
-                    writer = csv.DictWriter(file, fieldnames=["national", "year","month", "day", "hour"])
-                    writer.writerow(reading)
-
-            except struct.error:
-                print("Error: Unable to unpack data. Skipping frame...")
-                continue
-
-        time.sleep(5)  # prints out readings every 5 seconds
+try:
+    for chunk in read_chunks():
+        for frame in parser.feed(chunk):
+            reading = averager.add(frame)
+            if reading is not None:
+                handle_reading(reading)
 
 except KeyboardInterrupt:
     print("Exiting...")
-    ser.close()
+
+print(f"PMS5003 parser: {parser.stats}")
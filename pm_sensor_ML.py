@@ -1,10 +1,10 @@
-import pandas as pd
 import time
+import os
 import numpy as np
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 import paho.mqtt.client as mqtt
+from background_trainer import BackgroundTrainer
+from pm_model_registry import PMModelRegistry
+from pm_store import PMStore
 
 
 # MQTT Config
@@ -12,56 +12,46 @@ MQTT_BROKER = "localhost"
 MQTT_PORT = 1883
 PREDICTION_TOPIC = "sensor/pm_prediction"
 
-# Load the dataset
-df = pd.read_csv('psi_df_2016_2019.csv')
-
-# Load the sensor data
-sensor_df = pd.read_csv('sensor_readings.csv', on_bad_lines='skip')
-
-# Convert the 'timestamp' column to datetime format
-df['timestamp'] = pd.to_datetime(df['timestamp'])
-
-# Concatenate the new data with the existing DataFrame
-df = pd.concat([df, sensor_df], ignore_index=True)
-
-# Extract useful time-based features
-df['year'] = df['timestamp'].dt.year
-df['month'] = df['timestamp'].dt.month
-df['day'] = df['timestamp'].dt.day
-df['hour'] = df['timestamp'].dt.hour
-
-# Create lag features from 3 previous readings to predict 5 hours ahead
-def create_lag_features(df, window=3, horizon=5):
-    X, y = [], []
-    for i in range(len(df) - window - horizon):
-        chunk = df.iloc[i:i + window].values.flatten()
-        X.append(chunk)
-        y.append(df.iloc[i + window + horizon]['national'])
-    return pd.DataFrame(X), pd.Series(y)
-
-# Use only selected features
-feature_cols = ['national', 'year', 'month', 'day', 'hour']
-X, y = create_lag_features(df[feature_cols], window=3, horizon=5)
-
-# Split into training (80%) and testing (20%) sets
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-
-# Train a Random Forest model
-model = RandomForestRegressor(n_estimators=100, random_state=42)
-model.fit(X_train, y_train)
-
-# Evaluate model performance
-y_pred = model.predict(X_test)
-mae = mean_absolute_error(y_test, y_pred)
-mse = mean_squared_error(y_test, y_pred)
-r2 = r2_score(y_test, y_pred)
-
-print(f"Model evaluation:\nMAE: {mae}, MSE: {mse}, R2: {r2}")
-
-# Function to read the last 3 rows from sensor_readings.csv without relying on timestamp
+# Retrain once this many new hourly sensor rows have been completed since the current model was trained
+RETRAIN_ROWS = int(os.environ.get("PM_RETRAIN_ROWS", "24"))
+# Minimum test-split R2 a retrained model needs before it replaces the current one
+MIN_R2 = float(os.environ.get("PM_MODEL_MIN_R2", "0.0"))
+
+# Sensor readings come from the store written by pm_sensor.py (hourly means via its ml_features view).
+# Trained models are cached on disk (pm_models/), keyed on the training data and parameters
+store = PMStore()
+registry = PMModelRegistry(store=store)
+rejected_rows = 0  # new rows already seen by a rejected retrain, so it is not retried every loop
+
+def train_model():
+    """Trains on the PSI history plus all sensor readings; returns the model if it validates."""
+    global rejected_rows
+    print("Training PM2.5 model...")
+    rows = registry.new_rows()
+    # Any model beats none; after that a retrain has to pass the R2 check
+    model, metrics = registry.train(accept=lambda m: trainer.model is None or m["R2"] >= MIN_R2)
+    print(f"Model evaluation:\nMAE: {metrics['MAE']}, MSE: {metrics['MSE']}, R2: {metrics['R2']}")
+    if model is None:
+        rejected_rows = rows
+        print(f"New model rejected (R2 < {MIN_R2}), keeping the current one.")
+    else:
+        rejected_rows = 0
+    return model
+
+trainer = BackgroundTrainer(train_model, debounce=0, name="pm-trainer")
+
+start = time.perf_counter()
+cached_model = registry.load()
+if cached_model is not None:
+    trainer.set_model(cached_model)
+    print(f"Loaded cached PM2.5 model in {time.perf_counter() - start:.2f}s (trained {registry.meta['created']})")
+else:
+    print("No cached PM2.5 model matches the training data, training in the background...")
+
+# Last 3 hourly feature rows, the current (still running) hour included
 def get_last_3_readings():
-    sensor_df = pd.read_csv('sensor_readings.csv')
-    last_3_readings = sensor_df[['national', 'year', 'month', 'day', 'hour']].tail(3).values.tolist()
+    sensor_df = store.ml_features(closed_only=False, last=3)
+    last_3_readings = sensor_df[['national', 'year', 'month', 'day', 'hour']].values.tolist()
     return last_3_readings
 
 
@@ -70,7 +60,15 @@ client = mqtt.Client()
 client.connect(MQTT_BROKER, MQTT_PORT, 60)
 
 def predict_pm25_realtime():
+    model = trainer.model
+    if model is None:
+        print("Waiting for the first PM2.5 model...")
+        return
+
     last_3_readings = get_last_3_readings()
+    if len(last_3_readings) < 3:
+        print("Waiting for 3 hours of sensor readings...")
+        return
 
     updated_readings = []
     for r in last_3_readings:
@@ -88,9 +86,11 @@ def predict_pm25_realtime():
         client.publish(PREDICTION_TOPIC, payload)
 
 
+trainer.start()
 
-# Run the prediction every 10 seconds in an infinite loop
+# Run the prediction every 10 seconds in an infinite loop; retrain in the background once enough new rows arrived
 while True:
+    if not trainer.busy and (trainer.model is None or registry.new_rows() - rejected_rows >= RETRAIN_ROWS):
+        trainer.request()
     predict_pm25_realtime()
     time.sleep(10)
-
@@ -0,0 +1,187 @@
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+DB_FILE = "pm_readings.db"
+# Readings are timestamped in Singapore time (UTC+8), as in the CSV logs this store replaces
+LOCAL_TZ = timezone(timedelta(hours=8))
+# Raw readings older than this are deleted; their hourly rollups are kept
+RAW_RETENTION_DAYS = 30
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS readings (
+    ts INTEGER PRIMARY KEY,  -- epoch milliseconds (the rowid, so the table is ordered by time)
+    pm1_0 REAL,
+    pm2_5 REAL NOT NULL,
+    pm10 REAL,
+    status TEXT,
+    frames INTEGER
+);
+-- A pm1_0/pm10 sum is NULL for hours with readings that lacked the channel (e.g. imported from CSV)
+CREATE TABLE IF NOT EXISTS readings_hourly (
+    bucket INTEGER PRIMARY KEY,  -- epoch seconds of the start of the hour
+    count INTEGER NOT NULL,
+    pm1_0_sum REAL,
+    pm2_5_sum REAL NOT NULL,
+    pm2_5_max REAL NOT NULL,
+    pm10_sum REAL
+);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+-- Feature view for pm_sensor_ML.py: hourly mean PM2.5 as 'national' plus local calendar fields,
+-- matching the hourly PSI history it is trained with
+CREATE VIEW IF NOT EXISTS ml_features AS
+SELECT bucket AS ts,
+       pm2_5_sum / count AS national,
+       CAST(strftime('%Y', bucket, 'unixepoch', '+8 hours') AS INTEGER) AS year,
+       CAST(strftime('%m', bucket, 'unixepoch', '+8 hours') AS INTEGER) AS month,
+       CAST(strftime('%d', bucket, 'unixepoch', '+8 hours') AS INTEGER) AS day,
+       CAST(strftime('%H', bucket, 'unixepoch', '+8 hours') AS INTEGER) AS hour
+FROM readings_hourly;
+"""
+
+_HOURLY_UPSERT = """
+INSERT INTO readings_hourly (bucket, count, pm1_0_sum, pm2_5_sum, pm2_5_max, pm10_sum)
+VALUES (?, 1, ?, ?, ?, ?)
+ON CONFLICT(bucket) DO UPDATE SET
+    count = count + 1,
+    pm1_0_sum = pm1_0_sum + excluded.pm1_0_sum,
+    pm2_5_sum = pm2_5_sum + excluded.pm2_5_sum,
+    pm2_5_max = max(pm2_5_max, excluded.pm2_5_max),
+    pm10_sum = pm10_sum + excluded.pm10_sum
+"""
+
+
+def format_timestamp(ts_ms):
+    return datetime.fromtimestamp(ts_ms / 1000, LOCAL_TZ).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def parse_timestamp(text):
+    return int(datetime.strptime(text, "%Y-%m-%d %H:%M:%S").replace(tzinfo=LOCAL_TZ).timestamp() * 1000)
+
+
+class PMStore:
+    """PM readings in a local SQLite database in WAL mode.
+
+    Raw readings are keyed by their millisecond timestamp, so "last N" and
+    time-range queries are index lookups whose cost does not grow with the
+    history. Every insert also updates an hourly rollup (count, sums, max) in
+    the same transaction; raw rows older than raw_retention_days are deleted by
+    apply_retention() while the rollups are kept. The ml_features view derives
+    the training/prediction features from the rollups, so nothing is written
+    twice. WAL lets pm_sensor_ML.py read while pm_sensor.py writes, and each
+    thread gets its own connection.
+    """
+
+    def __init__(self, path=DB_FILE, raw_retention_days=RAW_RETENTION_DAYS):
+        self.path = path
+        self.raw_retention_days = raw_retention_days
+        self._local = threading.local()
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    # reading: dict with pm2_5 (and optionally pm1_0, pm10, status, frames); ts_ms defaults to now
+    def add(self, reading, ts_ms=None):
+        self.add_many([reading], [ts_ms if ts_ms is not None else int(time.time() * 1000)])
+
+    def add_many(self, readings, timestamps_ms):
+        connection = self._connection()
+        with connection:
+            for reading, ts_ms in zip(readings, timestamps_ms):
+                values = (reading.get("pm1_0"), reading["pm2_5"], reading.get("pm10"))
+                inserted = connection.execute(
+                    "INSERT OR IGNORE INTO readings (ts, pm1_0, pm2_5, pm10, status, frames) VALUES (?, ?, ?, ?, ?, ?)",
+                    (ts_ms, *values, reading.get("status"), reading.get("frames"))).rowcount
+                if inserted:  # a duplicate timestamp must not be counted twice in the rollup
+                    connection.execute(_HOURLY_UPSERT, (ts_ms // 1000 // 3600 * 3600, values[0], values[1], values[1], values[2]))
+
+    # Newest `n` raw readings, oldest first
+    def last(self, n):
+        rows = self._connection().execute("SELECT * FROM readings ORDER BY ts DESC LIMIT ?", (n,)).fetchall()
+        return [dict(row) for row in reversed(rows)]
+
+    # Raw readings with start_ms <= ts < end_ms, oldest first
+    def range(self, start_ms, end_ms):
+        rows = self._connection().execute(
+            "SELECT * FROM readings WHERE ts >= ? AND ts < ? ORDER BY ts", (start_ms, end_ms)).fetchall()
+        return [dict(row) for row in rows]
+
+    # Hourly rollups (with means) for start <= bucket < end (epoch seconds), oldest first
+    def hourly(self, start=0, end=None):
+        end = end if end is not None else 1 << 62
+        rows = self._connection().execute(
+            "SELECT bucket, count, pm2_5_sum / count AS pm2_5_mean, pm2_5_max, "
+            "pm1_0_sum / count AS pm1_0_mean, pm10_sum / count AS pm10_mean "
+            "FROM readings_hourly WHERE bucket >= ? AND bucket < ? ORDER BY bucket", (start, end)).fetchall()
+        return [dict(row) for row in rows]
+
+    # ML features as a DataFrame (ts, national, year, month, day, hour). By default only hours that
+    # have ended, so the rows never change afterwards; `after` returns only hours later than that ts.
+    # `until` limits the result to hours up to and including that ts.
+    def ml_features(self, closed_only=True, after=None, until=None, last=None):
+        import pandas as pd
+
+        query, params = "SELECT * FROM ml_features WHERE ts > ?", [after if after is not None else -1]
+        if closed_only:
+            query += " AND ts < ?"
+            params.append(int(time.time()) // 3600 * 3600)
+        if until is not None:
+            query += " AND ts <= ?"
+            params.append(until)
+        if last is not None:
+            query = f"SELECT * FROM ({query} ORDER BY ts DESC LIMIT ?)"
+            params.append(last)
+        return pd.read_sql_query(query + " ORDER BY ts", self._connection(), params=params)
+
+    # Delete raw readings older than the retention period (their hourly rollups stay)
+    def apply_retention(self, now_ms=None):
+        now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+        cutoff = now_ms - self.raw_retention_days * 86400 * 1000
+        connection = self._connection()
+        with connection:
+            deleted = connection.execute("DELETE FROM readings WHERE ts < ?", (cutoff,)).rowcount
+        return deleted
+
+    def count(self):
+        return self._connection().execute("SELECT count(*) FROM readings").fetchone()[0]
+
+    def get_meta(self, key):
+        row = self._connection().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key, value):
+        connection = self._connection()
+        with connection:
+            connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    # One-off import of the old pm_readings.csv (timestamp, status, pm2_5). sensor_readings.csv held the
+    # same readings in another layout, so it is not needed. Returns the number of rows imported.
+    def migrate_csv(self, csv_path="pm_readings.csv"):
+        import csv
+
+        if self.get_meta("migrated_csv") or not os.path.exists(csv_path):
+            return 0
+        readings, timestamps = [], []
+        with open(csv_path, newline='') as file:
+            for row in csv.DictReader(file):
+                # Parse both fields before keeping either, so the two lists stay aligned row for row
+                try:
+                    timestamp = parse_timestamp(row["timestamp"])
+                    pm2_5 = float(row["pm2_5"])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                timestamps.append(timestamp)
+                readings.append({"pm2_5": pm2_5, "status": row.get("status")})
+        self.add_many(readings, timestamps)
+        self.set_meta("migrated_csv", csv_path)
+        return len(readings)
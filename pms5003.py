@@ -0,0 +1,128 @@
+import struct
+import time
+
+# PMS5003 frame: "BM", length (28), 13 big-endian words, checksum = sum of the 30 preceding bytes
+HEADER = b"\x42\x4d"
+FRAME_LENGTH = 28
+FRAME_SIZE = 4 + FRAME_LENGTH
+_BODY = struct.Struct(">13HH")
+
+# The six PM concentration channels (ug/m3): standard particle (CF=1) and atmospheric environment
+PM_FIELDS = ("pm1_0_cf1", "pm2_5_cf1", "pm10_cf1", "pm1_0_atm", "pm2_5_atm", "pm10_atm")
+# Particles > size (um) per 0.1 L of air
+COUNT_FIELDS = ("gt0_3um", "gt0_5um", "gt1_0um", "gt2_5um", "gt5_0um", "gt10um")
+
+
+class PMS5003Parser:
+    """Incremental PMS5003 frame parser for a byte stream of arbitrary chunks.
+
+    feed() appends to a persistent buffer and returns every complete, valid
+    frame in it. The header is searched for in the buffer rather than read at
+    a fixed position, so after noise, a dropped byte or a bad frame the parser
+    resynchronises on the next header instead of by chance. Frames with a wrong
+    length field or checksum are counted and skipped one byte at a time, so a
+    header-like byte pair inside a corrupted frame cannot hide the real next one.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.stats = {"frames": 0, "checksum_errors": 0, "length_errors": 0, "skipped_bytes": 0}
+
+    def feed(self, data):
+        self.buffer += data
+        frames = []
+        while True:
+            start = self.buffer.find(HEADER)
+            if start == -1:
+                # Keep a trailing 0x42: it may be the first half of a header split across chunks
+                keep = 1 if self.buffer[-1:] == HEADER[:1] else 0
+                self.stats["skipped_bytes"] += len(self.buffer) - keep
+                del self.buffer[:len(self.buffer) - keep]
+                return frames
+            if start:
+                self.stats["skipped_bytes"] += start
+                del self.buffer[:start]
+            if len(self.buffer) < 4:
+                return frames
+
+            length = (self.buffer[2] << 8) | self.buffer[3]
+            if length != FRAME_LENGTH:
+                self.stats["length_errors"] += 1
+                self._skip_header()
+                continue
+            if len(self.buffer) < FRAME_SIZE:
+                return frames
+
+            words = _BODY.unpack_from(self.buffer, 4)
+            if sum(self.buffer[:FRAME_SIZE - 2]) != words[-1]:
+                self.stats["checksum_errors"] += 1
+                self._skip_header()
+                continue
+
+            frame = dict(zip(PM_FIELDS, words[:6]))
+            frame.update(zip(COUNT_FIELDS, words[6:12]))
+            frames.append(frame)
+            self.stats["frames"] += 1
+            del self.buffer[:FRAME_SIZE]
+
+    def _skip_header(self):
+        self.stats["skipped_bytes"] += 1
+        del self.buffer[:1]
+
+
+class FrameAverager:
+    """Turns the ~1 Hz frame stream into one reading per `interval` seconds.
+
+    Every frame is consumed; the policy decides what a reading is: "mean" of
+    the PM channels over the interval, "max" (worst case), or "latest" frame.
+    add() returns the finished reading (with the number of frames it covers)
+    when a frame arrives after the interval has elapsed, otherwise None.
+    """
+
+    def __init__(self, interval=5.0, policy="mean"):
+        if policy not in ("mean", "max", "latest"):
+            raise ValueError(f"Unknown averaging policy {policy!r}")
+        self.interval = interval
+        self.policy = policy
+        self.started = None
+        self.frames = []
+
+    def add(self, frame, now=None):
+        now = time.monotonic() if now is None else now
+        reading = None
+        if self.started is not None and now - self.started >= self.interval and self.frames:
+            reading = self._reduce()
+            self.frames = []
+            self.started = None
+        if self.started is None:
+            self.started = now
+        self.frames.append(frame)
+        return reading
+
+    def _reduce(self):
+        if self.policy == "latest":
+            reading = dict(self.frames[-1])
+        else:
+            reduce = max if self.policy == "max" else (lambda values: round(sum(values) / len(values), 1))
+            reading = {field: reduce([frame[field] for frame in self.frames]) for field in PM_FIELDS}
+        reading["frames"] = len(self.frames)
+        return reading
+
+
+# Build a valid frame (used for replay captures and tests of the parser)
+def encode_frame(pm, counts=(0, 0, 0, 0, 0, 0)):
+    body = HEADER + struct.pack(">H12HH", FRAME_LENGTH, *pm, *counts, 0)
+    return body + struct.pack(">H", sum(body))
+
+
+# Stream a recorded binary capture in serial-sized chunks; with `realtime` at the sensor's pace of
+# one frame per `frame_interval` seconds (about 1 s in active mode)
+def replay(path, chunk_size=64, realtime=False, frame_interval=1.0):
+    with open(path, mode='rb') as file:
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                return
+            if realtime:
+                time.sleep(len(chunk) / FRAME_SIZE * frame_interval)
+            yield chunk
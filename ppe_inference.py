@@ -0,0 +1,204 @@
+import glob
+import os
+import threading
+
+import cv2
+import numpy as np
+
+# Input size expected by both MobileNet-based PPE classifiers
+INPUT_SIZE = (224, 224)
+
+# Class index 0 is the compliant class for both models
+MASK_LABELS = ("mask", "no-mask")
+EARMUFF_LABELS = ("with_earmuff", "without_earmuff")
+
+# Model artifacts: the Keras originals and their converted TFLite counterparts (see convert_ppe_models.py)
+MASK_MODEL_FILE = "mask_detector.keras"
+EARMUFF_MODEL_FILE = "earmuff_detector.keras"
+
+
+# Resize and normalize frames into one (N, 224, 224, 3) float32 batch.
+# Each frame is resized once and shared by every classifier that runs on it.
+def preprocess_frames(frames):
+    batch = np.empty((len(frames), INPUT_SIZE[1], INPUT_SIZE[0], 3), dtype=np.float32)
+    for i, frame in enumerate(frames):
+        batch[i] = cv2.resize(frame, INPUT_SIZE)
+    batch *= 1.0 / 255.0
+    return batch
+
+
+# Cut each person box (x, y, w, h) out of a frame with a small margin; crops are views, not copies
+def crop_people(image_frame, boxes, margin=0.1):
+    frame_h, frame_w = image_frame.shape[:2]
+    crops = []
+    for x, y, w, h in boxes:
+        dx, dy = int(w * margin), int(h * margin)
+        x0, y0 = max(0, x - dx), max(0, y - dy)
+        x1, y1 = min(frame_w, x + w + dx), min(frame_h, y + h + dy)
+        if x1 > x0 and y1 > y0:
+            crops.append(image_frame[y0:y1, x0:x1])
+        else:
+            crops.append(image_frame)
+    return crops
+
+
+# Load up to `limit` sample frames (jpg/png) from a folder, e.g. for int8 calibration or benchmarking
+def load_sample_frames(folder, limit=None):
+    paths = []
+    for pattern in ("*.jpg", "*.jpeg", "*.png"):
+        paths.extend(glob.glob(os.path.join(folder, pattern)))
+    frames = [cv2.imread(path) for path in sorted(paths)[:limit]]
+    return [frame for frame in frames if frame is not None]
+
+
+# Map a batch of softmax outputs to label strings
+def _to_labels(predictions, labels):
+    return [labels[i] for i in np.argmax(predictions, axis=1)]
+
+
+class _BaseEngine:
+    """Shared label mapping; backends implement predict_raw() returning class probabilities."""
+
+    backend = None
+
+    def predict_raw(self, batch, mask=True, earmuff=True):
+        raise NotImplementedError
+
+    # Classify a preprocessed batch; heads that are not requested return None
+    def predict(self, batch, mask=True, earmuff=True):
+        if len(batch) == 0 or not (mask or earmuff):
+            return None, None
+        mask_pred, earmuff_pred = self.predict_raw(batch, mask=mask, earmuff=earmuff)
+        mask_labels = _to_labels(mask_pred, MASK_LABELS) if mask_pred is not None else None
+        earmuff_labels = _to_labels(earmuff_pred, EARMUFF_LABELS) if earmuff_pred is not None else None
+        return mask_labels, earmuff_labels
+
+    # Convenience wrapper: preprocess raw BGR frames (or person crops) and classify them
+    def predict_frames(self, frames, mask=True, earmuff=True):
+        return self.predict(preprocess_frames(frames), mask=mask, earmuff=earmuff)
+
+
+class PPEInferenceEngine(_BaseEngine):
+    """Runs the mask and earmuff Keras classifiers on a shared preprocessed batch.
+
+    Both Keras models are fused into a single two-head model and called
+    through compiled tf.functions instead of model.predict, which avoids
+    the per-call setup overhead of predict on small batches.
+    """
+
+    backend = "keras"
+
+    def __init__(self, mask_model, earmuff_model):
+        import tensorflow as tf
+
+        inputs = tf.keras.Input(shape=(INPUT_SIZE[1], INPUT_SIZE[0], 3))
+        self.fused_model = tf.keras.Model(inputs, [mask_model(inputs), earmuff_model(inputs)])
+
+        # A fixed signature with a dynamic batch axis keeps the functions from
+        # retracing when the number of frames (cameras, people) changes
+        signature = [tf.TensorSpec(shape=(None, INPUT_SIZE[1], INPUT_SIZE[0], 3), dtype=tf.float32)]
+        self._run_both = tf.function(lambda x: self.fused_model(x, training=False), input_signature=signature)
+        self._run_mask = tf.function(lambda x: mask_model(x, training=False), input_signature=signature)
+        self._run_earmuff = tf.function(lambda x: earmuff_model(x, training=False), input_signature=signature)
+
+    def predict_raw(self, batch, mask=True, earmuff=True):
+        if mask and earmuff:
+            mask_pred, earmuff_pred = self._run_both(batch)
+            return mask_pred.numpy(), earmuff_pred.numpy()
+        if mask:
+            return self._run_mask(batch).numpy(), None
+        return None, self._run_earmuff(batch).numpy()
+
+
+# Prefer the standalone tflite_runtime package; fall back to the interpreter bundled with TensorFlow
+def _tflite_interpreter_class():
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        from tensorflow.lite import Interpreter
+    return Interpreter
+
+
+class _TFLiteModel:
+    """One TFLite classifier. Handles int8/uint8 (de)quantization and batch resizing.
+
+    A TFLite interpreter is not thread-safe, so calls are serialized with a lock.
+    """
+
+    def __init__(self, path, num_threads):
+        self.path = path
+        self.interpreter = _tflite_interpreter_class()(model_path=path, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self.input = self.interpreter.get_input_details()[0]
+        self.output = self.interpreter.get_output_details()[0]
+        self.batch_size = int(self.input["shape"][0])
+        self._lock = threading.Lock()
+
+    def _resize(self, batch_size):
+        self.interpreter.resize_tensor_input(self.input["index"], [batch_size, INPUT_SIZE[1], INPUT_SIZE[0], 3])
+        self.interpreter.allocate_tensors()
+        self.input = self.interpreter.get_input_details()[0]
+        self.output = self.interpreter.get_output_details()[0]
+        self.batch_size = batch_size
+
+    def __call__(self, batch):
+        batch_input = batch
+        scale, zero_point = self.input["quantization"]
+        if self.input["dtype"] in (np.int8, np.uint8) and scale:
+            info = np.iinfo(self.input["dtype"])
+            batch_input = np.clip(np.round(batch / scale + zero_point), info.min, info.max).astype(self.input["dtype"])
+
+        with self._lock:
+            if len(batch) != self.batch_size:
+                self._resize(len(batch))
+            self.interpreter.set_tensor(self.input["index"], batch_input)
+            self.interpreter.invoke()
+            output = self.interpreter.get_tensor(self.output["index"])
+
+        scale, zero_point = self.output["quantization"]
+        if self.output["dtype"] in (np.int8, np.uint8) and scale:
+            output = (output.astype(np.float32) - zero_point) * scale
+        return output
+
+
+class TFLitePPEEngine(_BaseEngine):
+    """Runs converted (float16 / int8) TFLite versions of the two classifiers."""
+
+    backend = "tflite"
+
+    def __init__(self, mask_path, earmuff_path, num_threads=2):
+        self.mask_model = _TFLiteModel(mask_path, num_threads)
+        self.earmuff_model = _TFLiteModel(earmuff_path, num_threads)
+
+    def predict_raw(self, batch, mask=True, earmuff=True):
+        mask_pred = self.mask_model(batch) if mask else None
+        earmuff_pred = self.earmuff_model(batch) if earmuff else None
+        return mask_pred, earmuff_pred
+
+
+# Path of the converted artifact for a Keras model file, e.g. mask_detector.keras -> mask_detector_int8.tflite
+def tflite_path(keras_path, variant):
+    return f"{os.path.splitext(keras_path)[0]}_{variant}.tflite"
+
+
+# Load the PPE engine for the requested backend ("auto", "tflite" or "keras").
+# "auto" and "tflite" use the converted artifacts when both exist and fall back to Keras otherwise.
+def load_ppe_engine(backend="auto", variant="int8", num_threads=2,
+                    mask_path=MASK_MODEL_FILE, earmuff_path=EARMUFF_MODEL_FILE):
+    if backend in ("auto", "tflite"):
+        mask_tflite, earmuff_tflite = tflite_path(mask_path, variant), tflite_path(earmuff_path, variant)
+        if os.path.exists(mask_tflite) and os.path.exists(earmuff_tflite):
+            try:
+                engine = TFLitePPEEngine(mask_tflite, earmuff_tflite, num_threads=num_threads)
+                print(f"Loaded TFLite PPE models ({variant}, {num_threads} threads)")
+                return engine
+            except (ImportError, ValueError, RuntimeError) as e:
+                print(f"Could not load TFLite PPE models, falling back to Keras: {e}")
+        else:
+            print(f"No converted {variant} TFLite PPE models found, falling back to Keras")
+
+    from tensorflow.keras.models import load_model
+
+    engine = PPEInferenceEngine(load_model(mask_path), load_model(earmuff_path))
+    print("Loaded Keras PPE models")
+    return engine
@@ -3,9 +3,9 @@ import logging
 from telegram import ForceReply, Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import Application, CommandHandler, ContextTypes, MessageHandler, filters, CallbackQueryHandler
 import paho.mqtt.client as mqtt  # MQTT library for integration
-import base64
 from io import BytesIO
 import json
+from image_envelope import decode_image_payload
 
 # # Enable logging
 # logging.basicConfig(
@@ -146,21 +146,24 @@ def on_message(client, userdata, msg):
 
 async def handle_mqtt_message(chat_id, topic, message):
     try:
+        # Image topics arrive as binary envelopes (or legacy base64 / JSON from older publishers)
         if topic == "sensor/picture":
-            decoded_image = base64.b64decode(message)
+            _, decoded_image = decode_image_payload(message)
             image_file = BytesIO(decoded_image)
             await application.bot.send_photo(chat_id=chat_id, photo=image_file)
         elif topic == "sensor/PMAlertMessage":
-            payload = json.loads(message.decode())
-            decoded_image = base64.b64decode(payload["image"])
+            payload, decoded_image = decode_image_payload(message)
             image_file = BytesIO(decoded_image)
             caption = f"{payload['message']}\nPM2.5: {payload['pm_reading']}"
+            if "camera" in payload:
+                caption += f"\nCamera: {payload['camera']}"
             await application.bot.send_photo(chat_id=chat_id, photo=image_file, caption=caption)
         elif topic == "sensor/NoiseAlertMessage":
-            payload = json.loads(message.decode())
-            decoded_image = base64.b64decode(payload["image"])
+            payload, decoded_image = decode_image_payload(message)
             image_file = BytesIO(decoded_image)
             caption = f"{payload['message']}"
+            if "camera" in payload:
+                caption += f"\nCamera: {payload['camera']}"
             await application.bot.send_photo(chat_id=chat_id, photo=image_file, caption=caption)
         elif topic == "sensor/pm_reading":
             parsed = json.loads(message.decode())
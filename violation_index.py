@@ -0,0 +1,49 @@
+import csv
+import threading
+from collections import Counter
+
+
+class ViolationIndex:
+    """In-process violation counts per (date, hour, violation_type).
+
+    Seeded once from the violations CSV, then updated incrementally as
+    violations are recorded. `version` increases on every change so rendered
+    output can be cached against it.
+    """
+
+    def __init__(self):
+        self.counts = Counter()
+        self.version = 0
+        self._lock = threading.Lock()
+
+    # Timestamps are "YYYY-MM-DD HH:MM:SS"; slicing avoids a datetime parse per row
+    @staticmethod
+    def _key(timestamp, violation_type):
+        return timestamp[:10], int(timestamp[11:13]), violation_type
+
+    def seed_from_csv(self, path):
+        counts = Counter()
+        try:
+            with open(path, mode='r', newline='') as file:
+                reader = csv.reader(file)
+                next(reader, None)  # Headers
+                for row in reader:
+                    if len(row) >= 2 and len(row[0]) >= 13:
+                        counts[self._key(row[0], row[1])] += 1
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            self.counts = counts
+            self.version += 1
+        return sum(counts.values())
+
+    def add(self, timestamp, violation_type):
+        with self._lock:
+            self.counts[self._key(timestamp, violation_type)] += 1
+            self.version += 1
+
+    # Consistent (version, counts copy) pair for rendering
+    def snapshot(self):
+        with self._lock:
+            return self.version, dict(self.counts)
+
@@ -0,0 +1,81 @@
+import atexit
+import csv
+import os
+import threading
+
+
+class ViolationStore:
+    """Buffered, thread-safe CSV writer for violation records.
+
+    add() only appends to an in-memory buffer. A background writer flushes the
+    buffer in one write + fsync when it reaches batch_size rows or every
+    flush_interval seconds, whichever comes first. The file keeps the plain CSV
+    format, so existing logs and pandas readers are unaffected. close() (also
+    registered with atexit) stops the writer and flushes whatever is pending.
+    """
+
+    def __init__(self, path, headers, batch_size=50, flush_interval=5.0):
+        self.path = path
+        self.headers = headers
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.pending = []
+        self.rows_written = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._write_lock = threading.Lock()
+        self._closed = False
+
+        if not os.path.exists(path):
+            with open(path, mode='w', newline='') as file:
+                csv.writer(file).writerow(headers)
+        self._file = open(path, mode='a', newline='')
+        self._writer = csv.writer(self._file)
+
+        self._thread = threading.Thread(target=self._run, name="violation-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # Buffer one row; wakes the writer early once a full batch is waiting
+    def add(self, row):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("ViolationStore is closed")
+            self.pending.append(row)
+            if len(self.pending) >= self.batch_size:
+                self._wake.notify()
+
+    # Write all buffered rows to disk now (also used before reading the file back)
+    def flush(self):
+        with self._write_lock:
+            with self._lock:
+                rows, self.pending = self.pending, []
+            if not rows:
+                return 0
+            self._writer.writerows(rows)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.rows_written += len(rows)
+            return len(rows)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                self._wake.wait_for(lambda: self._closed or len(self.pending) >= self.batch_size,
+                                    timeout=self.flush_interval)
+                if self._closed:
+                    return
+            try:
+                self.flush()
+            except OSError as e:
+                print(f"Error writing violations to {self.path}: {e}")
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._wake.notify()
+        self._thread.join(timeout=self.flush_interval)
+        self.flush()
+        self._file.close()